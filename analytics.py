@@ -0,0 +1,88 @@
+"""Inter-key latency analytics over keystroke journals."""
+import os
+from typing import Any
+
+from persistence import load_key_stats
+from typing_class import KeystrokeLog
+
+NGRAM_SIZES = (2, 3)
+# Gaps longer than this are pauses, not transitions, and are skipped.
+MAX_GAP_SEC = 2.0
+# Gaps shorter than this are keys stamped together after a stalled frame, not
+# real transitions, and are skipped too.
+MIN_GAP_SEC = 0.002
+NGRAM_FIELDS = ("ngram_counts", "ngram_latency_ms", "ngram_errors")
+
+
+def ngram_stats(journal: KeystrokeLog, sizes: tuple[int, ...] = NGRAM_SIZES) -> dict[str, dict[str, float]]:
+    """Per-n-gram count, summed latency (ms) and error count in one pass over a journal.
+
+    An n-gram is the expected text of n consecutive keys with no backspace,
+    overflow key or implausible gap between them and the first n-1 typed
+    correctly. Its latency is the time from the first to the last key; an
+    error means the last key was wrong.
+    """
+    counts: dict[str, float] = {}
+    latency: dict[str, float] = {}
+    errors: dict[str, float] = {}
+    longest = max(sizes)
+    window_chars: list[str] = []
+    window_times: list[float] = []
+    window_ok: list[bool] = []
+
+    expected_col = journal.expected
+    for i, (timestamp, cp) in enumerate(zip(journal.timestamps, expected_col)):
+        gap = timestamp - window_times[-1] if window_times else MIN_GAP_SEC
+        if cp < 0 or not MIN_GAP_SEC <= gap <= MAX_GAP_SEC:
+            # Backspaces, overflow keys, long pauses and batched stamps break the run.
+            window_chars.clear()
+            window_times.clear()
+            window_ok.clear()
+            if cp < 0:
+                continue
+        correct = journal.is_correct(i)
+        window_chars.append(chr(cp))
+        window_times.append(timestamp)
+        window_ok.append(correct)
+        if len(window_chars) > longest:
+            del window_chars[0], window_times[0], window_ok[0]
+
+        depth = len(window_chars)
+        for n in sizes:
+            if depth < n or not all(window_ok[depth - n:depth - 1]):
+                continue
+            gram = "".join(window_chars[depth - n:])
+            if "\n" in gram:
+                continue
+            counts[gram] = counts.get(gram, 0) + 1
+            latency[gram] = latency.get(gram, 0.0) + (timestamp - window_times[depth - n]) * 1000
+            if not correct:
+                errors[gram] = errors.get(gram, 0) + 1
+
+    return {"ngram_counts": counts, "ngram_latency_ms": latency, "ngram_errors": errors}
+
+
+def slowest_ngrams(
+    stats: dict[str, Any], top_k: int = 8, n: int = 2, min_count: float = 3.0
+) -> list[tuple[str, float]]:
+    """(n-gram, mean latency ms) for the slowest n-grams of length `n` in an aggregate.
+
+    Latency is normalised per transition so bigrams and trigrams compare alike.
+    Grams starting or ending in whitespace are skipped since they drill poorly.
+    """
+    counts = stats.get("ngram_counts", {})
+    latency = stats.get("ngram_latency_ms", {})
+    means = [
+        (gram, latency.get(gram, 0.0) / count / (n - 1))
+        for gram, count in counts.items()
+        if len(gram) == n and count >= min_count and gram == gram.strip()
+    ]
+    return sorted(means, key=lambda kv: kv[1], reverse=True)[:top_k]
+
+
+def slow_ngrams(path: str | os.PathLike[str] = "data/sessions", top_k: int = 6) -> list[str]:
+    """Slowest bigrams then trigrams from the persisted aggregate."""
+    stats = load_key_stats(path)
+    grams = [g for g, _ in slowest_ngrams(stats, top_k, n=2)]
+    grams += [g for g, _ in slowest_ngrams(stats, top_k // 2, n=3)]
+    return grams
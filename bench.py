@@ -0,0 +1,280 @@
+"""Headless benchmark for the typing engine.
+
+Replays a synthetic keystroke trace through TypingController/TextStream on
+the SDL dummy video driver and prints JSON results, e.g.
+
+    python3 bench.py --chars 20000 --error-rate 0.05 --backspace-rate 0.03 -o bench.json
+
+`--startup N` also launches the app N times in fresh processes and reports
+import time, time to first frame and time from picking a text to the first
+typeable frame.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from cursor import Cursor
+from draw import draw_hud
+from scoring import accuracy, gross_wpm, per_key_errors
+from text_stream import TextStream
+from typing_class import TypingController
+
+WORDS_FALLBACK = "the quick brown fox jumps over the lazy dog while typing drills repeat".split()
+
+
+def make_passage(chars: int, seed: int, texts_dir: str = "data/texts") -> str:
+    """Random passage of roughly `chars` characters drawn from the bundled texts."""
+    words: list[str] = []
+    for path in sorted(Path(texts_dir).glob("*.txt")):
+        words.extend(path.read_text(encoding="utf-8", errors="replace").split())
+    words = words or WORDS_FALLBACK
+    rng = random.Random(seed)
+    out: list[str] = []
+    size = 0
+    while size < chars:
+        word = rng.choice(words)
+        out.append(word)
+        size += len(word) + 1
+        if rng.random() < 0.02:
+            out.append("\n")
+    return " ".join(out)[:chars]
+
+
+def make_trace(passage: str, error_rate: float, backspace_rate: float, seed: int) -> list[tuple[int, str]]:
+    """(key, unicode) pairs that type the passage with the given error/backspace mix."""
+    rng = random.Random(seed)
+    trace: list[tuple[int, str]] = []
+    pos = 0
+    while pos < len(passage):
+        if pos > 0 and rng.random() < backspace_rate:
+            trace.append((pygame.K_BACKSPACE, ""))
+            pos -= 1
+            continue
+        expected = passage[pos]
+        char = expected
+        if rng.random() < error_rate:
+            char = rng.choice("abcdefghijklmnopqrstuvwxyz")
+        trace.append((0, char))
+        pos += 1
+    return trace
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """Summary of samples (seconds) in milliseconds."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p90_ms": pick(0.90),
+        "p99_ms": pick(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def bench_layout(passage: str) -> dict[str, float]:
+    start = time.perf_counter()
+    stream = TextStream(content=passage)
+    stream.caret_for_index(0)
+    first_screen = time.perf_counter() - start
+
+    start = time.perf_counter()
+    while stream._extend_layout():
+        pass
+    full = time.perf_counter() - start
+    return {"first_screen_ms": first_screen * 1000, "full_layout_ms": full * 1000}
+
+
+def bench_caret(passage: str, samples: int, seed: int) -> dict[str, float]:
+    stream = TextStream(content=passage)
+    rng = random.Random(seed)
+    timings = []
+    for _ in range(samples):
+        index = rng.randrange(len(passage) + 1)
+        start = time.perf_counter()
+        stream.caret_for_index(index)
+        timings.append(time.perf_counter() - start)
+    return percentiles(timings)
+
+
+def _new_run(passage: str) -> tuple[TextStream, Cursor, TypingController]:
+    stream = TextStream(content=passage)
+    cursor = Cursor()
+    cursor.background = stream.surface
+    return stream, cursor, TypingController(stream, cursor)
+
+
+def bench_memory(passage: str, trace: list[tuple[int, str]]) -> dict[str, int]:
+    """Peak traced allocation for a replay (kept separate so timings aren't skewed)."""
+    gc.collect()
+    tracemalloc.start()
+    _, _, controller = _new_run(passage)
+    for key, unicode in trace:
+        controller.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode))
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_traced_bytes": peak, "retained_bytes": current, "keystrokes": len(controller.keystrokes)}
+
+
+def bench_typing(screen: pygame.Surface, passage: str, trace: list[tuple[int, str]], keys_per_frame: int):
+    stream, cursor, controller = _new_run(passage)
+
+    key_times: list[float] = []
+    frame_times: list[float] = []
+    for i, (key, unicode) in enumerate(trace):
+        event = pygame.event.Event(pygame.KEYDOWN, key=key, unicode=unicode)
+        start = time.perf_counter()
+        controller.handle_event(event)
+        key_times.append(time.perf_counter() - start)
+
+        if i % keys_per_frame == 0:
+            start = time.perf_counter()
+            rects = stream.draw(screen)
+            if cursor.rect.collidelist(rects) != -1:
+                cursor.dirty = True
+            rects.extend(cursor.draw(screen))
+            rects.append(draw_hud(screen, 0.0, 100.0, 0.0, stream.ind / max(1, len(passage))))
+            frame_times.append(time.perf_counter() - start)
+
+
+    start = time.perf_counter()
+    stats = controller.stats
+    stats.gross_wpm(60.0), stats.accuracy(), stats.per_key_errors()
+    running = time.perf_counter() - start
+
+    keystrokes = controller.keystrokes
+    start = time.perf_counter()
+    gross_wpm(keystrokes, 60.0), accuracy(keystrokes), per_key_errors(keystrokes)
+    rescan = time.perf_counter() - start
+
+    return {
+        "keystroke": percentiles(key_times),
+        "frame_draw": percentiles(frame_times),
+        "scoring": {"running_stats_ms": running * 1000, "full_rescan_ms": rescan * 1000},
+    }
+
+
+_STARTUP_SCRIPT = """
+import json, threading, time
+t0 = time.perf_counter()
+import main
+imported = time.perf_counter()
+import pygame
+
+def drive():
+    while "first_frame" not in main.startup_marks:
+        time.sleep(0.001)
+    # Fixed Text, then the first file.
+    for key in (pygame.K_2, pygame.K_RETURN):
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=""))
+    while "first_typeable" not in main.startup_marks:
+        time.sleep(0.001)
+    pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+threading.Thread(target=drive, daemon=True).start()
+main.main()
+marks = main.startup_marks
+print(json.dumps({
+    "import_ms": (imported - t0) * 1000,
+    "first_frame_ms": (marks["first_frame"] - t0) * 1000,
+    "first_typeable_ms": (marks["first_typeable"] - marks["run_requested"]) * 1000,
+}))
+"""
+
+
+def bench_startup(runs: int) -> dict:
+    """Cold-process startup milestones, median over `runs` launches."""
+    env = {**os.environ, "PYTHONPATH": str(Path(__file__).resolve().parent)}
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT], capture_output=True, text=True, env=env, timeout=60
+        )
+        lines = out.stdout.strip().splitlines()
+        if out.returncode != 0 or not lines:
+            raise RuntimeError(f"startup run failed: {out.stderr.strip()[-500:]}")
+        samples.append(json.loads(lines[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]} | {"runs": runs}
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(args: argparse.Namespace) -> dict:
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    passage = make_passage(args.chars, args.seed)
+    trace = make_trace(passage, args.error_rate, args.backspace_rate, args.seed)
+    results = {
+        "label": args.label,
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "params": {
+            "chars": len(passage),
+            "keys": len(trace),
+            "error_rate": args.error_rate,
+            "backspace_rate": args.backspace_rate,
+            "keys_per_frame": args.keys_per_frame,
+            "seed": args.seed,
+        },
+        "layout": bench_layout(passage),
+        "caret_for_index": bench_caret(passage, args.caret_samples, args.seed),
+        **bench_typing(screen, passage, trace, args.keys_per_frame),
+        "memory": bench_memory(passage, trace),
+    }
+    pygame.quit()
+    if args.startup:
+        results["startup"] = bench_startup(args.startup)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=5000, help="passage length in characters")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--backspace-rate", type=float, default=0.03)
+    parser.add_argument("--keys-per-frame", type=int, default=1, help="keystrokes handled between draws")
+    parser.add_argument("--caret-samples", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--startup", type=int, default=0, metavar="N", help="also time N cold app launches")
+    parser.add_argument("--label", default=None, help="free-form tag stored with the results")
+    parser.add_argument("-o", "--output", default=None, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Persisted metadata for the text library and an LRU cache of loaded texts."""
+import json
+import os
+import string
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from persistence import write_atomic
+
+CATALOG_PATH = "data/cache/catalog.json"
+CATALOG_VERSION = 1
+PREVIEW_CHARS = 160
+TEXT_CACHE_CHARS = 16_000_000
+
+_PUNCT = set(string.punctuation)
+
+# Loaded texts keyed by path, most recently used last; bounded by total chars.
+_text_cache: "OrderedDict[str, str]" = OrderedDict()
+_text_cache_size = 0
+
+
+def load_text(path: str | os.PathLike[str]) -> str:
+    """Return a text file's contents, served from memory after the first read."""
+    global _text_cache_size
+    key = str(path)
+    text = _text_cache.get(key)
+    if text is not None:
+        _text_cache.move_to_end(key)
+        return text
+    with open(key, "r") as f:
+        text = f.read()
+    _text_cache[key] = text
+    _text_cache_size += len(text)
+    while _text_cache_size > TEXT_CACHE_CHARS and len(_text_cache) > 1:
+        _, dropped = _text_cache.popitem(last=False)
+        _text_cache_size -= len(dropped)
+    return text
+
+
+def invalidate_text(path: str | os.PathLike[str]) -> None:
+    global _text_cache_size
+    dropped = _text_cache.pop(str(path), None)
+    if dropped is not None:
+        _text_cache_size -= len(dropped)
+
+
+def _count(text: str, counts: dict[str, int]) -> None:
+    words = text.split()
+    counts["words"] += len(words)
+    counts["word_chars"] += sum(len(w) for w in words)
+    counts["chars"] += len(text)
+    counts["newlines"] += text.count("\n")
+    for ch in text:
+        if ch.isalpha():
+            counts["letters"] += 1
+            if ch.isupper():
+                counts["upper"] += 1
+        elif ch.isdigit():
+            counts["digits"] += 1
+        elif ch in _PUNCT:
+            counts["punct"] += 1
+
+
+def _summarize(counts: dict[str, int]) -> dict[str, Any]:
+    typed = max(1, counts["chars"] - counts["newlines"])
+    avg_word = counts["word_chars"] / counts["words"] if counts["words"] else 0.0
+    # Longer words and more shifted/symbol keys make a passage harder.
+    difficulty = (
+        1
+        + 0.8 * max(0.0, avg_word - 3)
+        + 25 * (counts["upper"] + counts["punct"]) / typed
+        + 40 * counts["digits"] / typed
+    )
+    return {
+        "words": counts["words"],
+        "chars": counts["chars"],
+        "letters": counts["letters"],
+        "upper": counts["upper"],
+        "digits": counts["digits"],
+        "punct": counts["punct"],
+        "avg_word_len": round(avg_word, 2),
+        "difficulty": round(min(10.0, difficulty), 1),
+    }
+
+
+def _new_counts() -> dict[str, int]:
+    return dict.fromkeys(("words", "word_chars", "chars", "newlines", "letters", "upper", "digits", "punct"), 0)
+
+
+def text_stats(text: str) -> dict[str, Any]:
+    """Word count, character-class counts and a rough 1-10 difficulty score."""
+    counts = _new_counts()
+    _count(text, counts)
+    return _summarize(counts)
+
+
+def file_stats(path: str | os.PathLike[str], chunk_lines: int = 4096) -> dict[str, Any]:
+    """`text_stats` for a file, read in line batches so large files are never held whole."""
+    counts = _new_counts()
+    with open(path, "r") as f:
+        while True:
+            lines = f.readlines(chunk_lines * 80)
+            if not lines:
+                break
+            _count("".join(lines), counts)
+    return _summarize(counts)
+
+
+class Catalog:
+    """Text files in a directory with cached metadata.
+
+    Metadata is persisted and only recomputed for files whose mtime or size
+    changed. That happens on a background thread: `refresh` only scans the
+    directory, and new or changed files are listed without stats (`info`
+    returns {}) until `version` moves on. Previews are read lazily from the
+    head of each file.
+    """
+
+    def __init__(self, texts_dir: str | os.PathLike[str] = "data/texts", cache_path: str | os.PathLike[str] = CATALOG_PATH):
+        self.texts_dir = Path(texts_dir)
+        self.cache_path = Path(cache_path)
+        self.entries: dict[str, dict[str, Any]] = {}
+        # Bumped whenever stats for pending files land.
+        self.version = 0
+        self._pending: set[str] = set()
+        self._previews: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CATALOG_VERSION and data.get("dir") == str(self.texts_dir):
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+        self.refresh()
+
+    @property
+    def paths(self) -> list[Path]:
+        with self._lock:
+            names = set(self.entries) | self._pending
+        return [self.texts_dir / name for name in sorted(names)]
+
+    @property
+    def busy(self) -> bool:
+        """True while stats for new or changed files are still being computed."""
+        return bool(self._pending)
+
+    def info(self, path: Path) -> dict[str, Any]:
+        if path.name in self._pending:
+            return {}
+        return self.entries.get(path.name, {})
+
+    def preview(self, path: Path, chars: int = PREVIEW_CHARS) -> str:
+        """Opening text of a file; only its first few hundred chars are read, once."""
+        key = str(path)
+        text = self._previews.get(key)
+        if text is None:
+            try:
+                with open(key, "r") as f:
+                    head = f.read(chars * 2)
+            except (OSError, UnicodeDecodeError):
+                head = ""
+            text = self._previews[key] = " ".join(head.split())[:chars]
+        return text
+
+    def refresh(self) -> None:
+        """Rescan the directory and queue stats for new or changed files."""
+        removed = False
+        seen = set()
+        changed = []
+        if self.texts_dir.is_dir():
+            with os.scandir(self.texts_dir) as it:
+                for item in it:
+                    if not item.name.endswith(".txt") or not item.is_file():
+                        continue
+                    seen.add(item.name)
+                    st = item.stat()
+                    entry = self.entries.get(item.name)
+                    if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                        continue
+                    invalidate_text(item.path)
+                    self._previews.pop(item.path, None)
+                    changed.append(item.name)
+        with self._lock:
+            for name in set(self.entries) - seen:
+                del self.entries[name]
+                invalidate_text(self.texts_dir / name)
+                self._previews.pop(str(self.texts_dir / name), None)
+                removed = True
+            self._pending.intersection_update(seen)
+            self._pending.update(changed)
+            if self._pending and self._worker is None:
+                self._worker = threading.Thread(target=self._compute_pending, daemon=True)
+                self._worker.start()
+        if removed:
+            self._save()
+
+    def _compute_pending(self) -> None:
+        while True:
+            with self._lock:
+                name = min(self._pending) if self._pending else None
+            if name is None:
+                self._save()
+                with self._lock:
+                    # Files queued while saving keep this worker going.
+                    if not self._pending:
+                        self._worker = None
+                        return
+                continue
+            path = self.texts_dir / name
+            try:
+                st = path.stat()
+                stats = file_stats(path)
+            except (OSError, UnicodeDecodeError):
+                stats = None
+            with self._lock:
+                if stats is not None:
+                    self.entries[name] = {"mtime": st.st_mtime, "size": st.st_size, **stats}
+                self._pending.discard(name)
+                self.version += 1
+
+    def _save(self) -> None:
+        with self._lock:
+            data = {"version": CATALOG_VERSION, "dir": str(self.texts_dir), "entries": self.entries}
+            payload = json.dumps(data).encode("utf-8")
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.cache_path, payload)
+        except OSError:
+            pass
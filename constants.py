@@ -15,7 +15,9 @@ RED = (200, 30, 30)
 
 TIMED_DURATION_SEC = 60
 HUD_HEIGHT = 70
+HUD_REFRESH_SEC = 5.0
 ALLOW_BACKSPACE = True
+PROFILE = False
 
 
 def _parse_color(value: str):
@@ -34,7 +36,7 @@ def _parse_color(value: str):
 
 
 def load_settings(path: str | Path = "settings.ini"):
-    global SCREEN_WIDTH, SCREEN_HEIGHT, FPS, BLINK_RATE, WHITE, BLACK, GREEN, RED, TIMED_DURATION_SEC, HUD_HEIGHT, ALLOW_BACKSPACE
+    global SCREEN_WIDTH, SCREEN_HEIGHT, FPS, BLINK_RATE, WHITE, BLACK, GREEN, RED, TIMED_DURATION_SEC, HUD_HEIGHT, HUD_REFRESH_SEC, ALLOW_BACKSPACE, PROFILE
     ini_path = Path(path)
     if not ini_path.exists():
         return
@@ -46,6 +48,7 @@ def load_settings(path: str | Path = "settings.ini"):
         SCREEN_HEIGHT = config.getint("display", "height", fallback=SCREEN_HEIGHT)
         FPS = config.getint("display", "fps", fallback=FPS)
         HUD_HEIGHT = config.getint("display", "hud_height", fallback=HUD_HEIGHT)
+        HUD_REFRESH_SEC = config.getfloat("display", "hud_refresh_sec", fallback=HUD_REFRESH_SEC)
 
     if "timed" in config:
         TIMED_DURATION_SEC = config.getint("timed", "duration_sec", fallback=TIMED_DURATION_SEC)
@@ -53,6 +56,9 @@ def load_settings(path: str | Path = "settings.ini"):
     if "input" in config:
         ALLOW_BACKSPACE = config.getboolean("input", "allow_backspace", fallback=ALLOW_BACKSPACE)
 
+    if "debug" in config:
+        PROFILE = config.getboolean("debug", "profile", fallback=PROFILE)
+
     if "cursor" in config:
         BLINK_RATE = config.getfloat("cursor", "blink_rate", fallback=BLINK_RATE)
 
@@ -0,0 +1,252 @@
+"""On-disk index over data/texts for building drills from real text."""
+import hashlib
+import heapq
+import json
+import os
+import random
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable
+
+from persistence import write_atomic
+
+TEXTS_DIR = "data/texts"
+CACHE_DIR = "data/cache/corpus"
+MANIFEST_NAME = "manifest.json"
+LEGACY_INDEX_NAME = "corpus_index.json"
+INDEX_VERSION = 2
+# Densest sentences / words kept per char or bigram in each shard.
+POSTING_CAP = 48
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?")
+MIN_SENTENCE = 20
+MAX_SENTENCE = 240
+
+
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _gram_counts(text: str) -> Counter[str]:
+    """Occurrences of each character and bigram of a piece of text."""
+    counts = Counter(text)
+    counts.update(text[i:i + 2] for i in range(len(text) - 1))
+    return counts
+
+
+def _offer(heaps: dict[str, list], gram: str, item: tuple) -> None:
+    """Keep the POSTING_CAP largest items per gram."""
+    heap = heaps.setdefault(gram, [])
+    if len(heap) < POSTING_CAP:
+        heapq.heappush(heap, item)
+    elif item > heap[0]:
+        heapq.heapreplace(heap, item)
+
+
+def _parse_file(path: Path) -> dict[str, Any]:
+    """Shard for one file: its sentences plus capped gram -> sentence and gram -> word postings."""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    flat = " ".join(text.split())
+    sentences = [
+        s for s in _SENTENCE_END.split(flat) if MIN_SENTENCE <= len(s) <= MAX_SENTENCE
+    ]
+    sentence_heaps: dict[str, list[tuple[float, int]]] = {}
+    for i, sentence in enumerate(sentences):
+        for gram, count in _gram_counts(sentence).items():
+            _offer(sentence_heaps, gram, (count * len(gram) / len(sentence), i))
+    words = Counter(_WORD.findall(flat))
+    word_heaps: dict[str, list[tuple[float, str]]] = {}
+    for word, frequency in words.items():
+        weight = (1 + frequency) ** 0.5 / len(word)
+        for gram, count in _gram_counts(word).items():
+            _offer(word_heaps, gram, (count * len(gram) * weight, word))
+    return {
+        "version": INDEX_VERSION,
+        "sentences": sentences,
+        "sentences_by_gram": {gram: sorted(i for _, i in heap) for gram, heap in sentence_heaps.items()},
+        "words_by_gram": {gram: {w: words[w] for _, w in heap} for gram, heap in word_heaps.items()},
+    }
+
+
+class CorpusIndex:
+    """Per-file shards of sentences with capped char/bigram postings.
+
+    `manifest.json` maps each text file to its mtime, size and content hash;
+    the file's shard is `<hash>.json` next to it and is only rebuilt when the
+    content changes. Postings keep the POSTING_CAP densest sentences and words
+    per gram, so a drill scores a few hundred candidates, and shards are only
+    parsed when a drill first needs them.
+    """
+
+    def __init__(self, texts_dir: str | os.PathLike[str] = TEXTS_DIR, cache_dir: str | os.PathLike[str] = CACHE_DIR):
+        self.texts_dir = Path(texts_dir)
+        self.cache_dir = Path(cache_dir)
+        self.files: dict[str, dict[str, Any]] = {}
+        self._shards: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, texts_dir: str | os.PathLike[str] = TEXTS_DIR, cache_dir: str | os.PathLike[str] = CACHE_DIR) -> "CorpusIndex":
+        index = cls(texts_dir, cache_dir)
+        data: dict[str, Any] = {}
+        try:
+            with (index.cache_dir / MANIFEST_NAME).open("r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        if data.get("version") == INDEX_VERSION:
+            index.files = data.get("files", {})
+        index.refresh()
+        return index
+
+    def refresh(self) -> None:
+        """Pick up added, changed or removed text files."""
+        if self._refresh():
+            self._save_manifest()
+            self._prune()
+
+    def _refresh(self) -> bool:
+        """Rebuild shards of new or changed files; returns True if the manifest changed."""
+        changed = False
+        seen = set()
+        for path in sorted(self.texts_dir.glob("*.txt")):
+            if not path.is_file():
+                continue
+            name = path.name
+            seen.add(name)
+            st = path.stat()
+            entry = self.files.get(name)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                continue
+            digest = _file_digest(path)
+            if not entry or entry["sha1"] != digest:
+                self._build_shard(path, digest)
+            self.files[name] = {"mtime": st.st_mtime, "size": st.st_size, "sha1": digest}
+            changed = True
+        for name in set(self.files) - seen:
+            del self.files[name]
+            changed = True
+        return changed
+
+    def _shard_path(self, digest: str) -> Path:
+        return self.cache_dir / f"{digest}.json"
+
+    def _build_shard(self, path: Path, digest: str) -> dict[str, Any]:
+        shard = _parse_file(path)
+        self._shards[digest] = shard
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(self._shard_path(digest), json.dumps(shard, separators=(",", ":")).encode("utf-8"))
+        except OSError:
+            pass
+        return shard
+
+    def _shard(self, name: str) -> dict[str, Any]:
+        digest = self.files[name]["sha1"]
+        shard = self._shards.get(digest)
+        if shard is not None:
+            return shard
+        try:
+            with self._shard_path(digest).open("r", encoding="utf-8") as f:
+                shard = json.load(f)
+        except (OSError, ValueError):
+            shard = None
+        if shard is None or shard.get("version") != INDEX_VERSION:
+            return self._build_shard(self.texts_dir / name, digest)
+        self._shards[digest] = shard
+        return shard
+
+    def _save_manifest(self) -> None:
+        data = {"version": INDEX_VERSION, "files": self.files}
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.cache_dir / MANIFEST_NAME, json.dumps(data).encode("utf-8"))
+        except OSError:
+            pass
+
+    def _prune(self) -> None:
+        """Drop shards no text file refers to any more, and the old single-file index."""
+        live = {entry["sha1"] for entry in self.files.values()}
+        for digest in set(self._shards) - live:
+            del self._shards[digest]
+        stale = [p for p in self.cache_dir.glob("*.json") if p.name != MANIFEST_NAME and p.stem not in live]
+        for path in [*stale, self.cache_dir.parent / LEGACY_INDEX_NAME]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def passage(self, targets: Iterable[str], length: int = 400, seed: int | None = None) -> str:
+        """Real sentences (or words) densest in the target chars/bigrams, about `length` long."""
+        targets = [t for t in targets if t.strip() and 1 <= len(t) <= 2]
+        if not targets:
+            return ""
+        shards = [self._shard(name) for name in sorted(self.files)]
+        candidates: set[str] = set()
+        for shard in shards:
+            sentences = shard["sentences"]
+            for target in targets:
+                candidates.update(sentences[i] for i in shard["sentences_by_gram"].get(target, ()))
+
+        rng = random.Random(seed)
+        if candidates:
+            scored = sorted(candidates, key=lambda s: (self._density(s, targets), s), reverse=True)
+            # Sample from the densest few so repeated drills differ.
+            pool = scored[: max(8, length // 40)]
+            rng.shuffle(pool)
+            output: list[str] = []
+            size = 0
+            for sentence in pool:
+                if size >= length:
+                    break
+                output.append(sentence)
+                size += len(sentence) + 1
+            if size >= length // 2:
+                return " ".join(output)[:length].rsplit(" ", 1)[0]
+
+        counts: Counter[str] = Counter()
+        for shard in shards:
+            found: dict[str, int] = {}
+            for target in targets:
+                found.update(shard["words_by_gram"].get(target, {}))
+            counts.update(found)
+        if not counts:
+            return ""
+        ranked = sorted(
+            counts,
+            key=lambda w: (self._density(w, targets) * (1 + counts[w]) ** 0.5, w),
+            reverse=True,
+        )
+        pool = ranked[:40]
+        out: list[str] = []
+        size = 0
+        while size < length:
+            word = rng.choice(pool)
+            out.append(word)
+            size += len(word) + 1
+        return " ".join(out)[:length].rsplit(" ", 1)[0]
+
+    @staticmethod
+    def _density(text: str, targets: list[str]) -> float:
+        return sum(text.count(t) * len(t) for t in targets) / max(1, len(text))
+
+
+_corpus: CorpusIndex | None = None
+_corpus_lock = threading.Lock()
+
+
+def get_corpus() -> CorpusIndex:
+    """Process-wide index, refreshed from file stats on every call."""
+    global _corpus
+    with _corpus_lock:
+        if _corpus is None:
+            _corpus = CorpusIndex.load()
+        else:
+            _corpus.refresh()
+        return _corpus
@@ -11,9 +11,27 @@ class Cursor(pygame.sprite.Sprite):
         self.rect = pygame.Rect(20, 30, 3, 40)
         self.color = WHITE
         self.blink_rate = BLINK_RATE
+        # Surface used to erase the previous caret; falls back to BLACK.
+        self.background: pygame.Surface | None = None
+        self._drawn_rect: pygame.Rect | None = None
+        self.dirty = True
     
-    def draw(self, screen):
-        pygame.draw.rect(screen, self.color, self.rect)
+    def draw(self, screen) -> list[pygame.Rect]:
+        if not self.dirty:
+            return []
+        rects = []
+        if self._drawn_rect is not None:
+            if self.background is not None:
+                screen.blit(self.background, self._drawn_rect, self._drawn_rect)
+            else:
+                screen.fill(BLACK, self._drawn_rect)
+            rects.append(self._drawn_rect)
+        if self.color != BLACK:
+            pygame.draw.rect(screen, self.color, self.rect)
+        self._drawn_rect = self.rect.copy()
+        rects.append(self._drawn_rect)
+        self.dirty = False
+        return rects
 
     def update(self, dt):
         if self.blink_rate <= 0:
@@ -22,8 +40,10 @@ class Cursor(pygame.sprite.Sprite):
             else:
                 self.color = WHITE
             self.blink_rate = BLINK_RATE
+            self.dirty = True
         self.blink_rate -= dt
 
     def move_to(self, x: int, y: int, height: int):
         self.rect.topleft = (x, y)
         self.rect.height = height
+        self.dirty = True
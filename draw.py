@@ -1,18 +1,25 @@
 import pygame
 from constants import WHITE, GREEN, HUD_HEIGHT
+from fonts import get_font, render_text
 
+HUD_FONT_SIZE = 32
 
-def draw_hud(surface: pygame.Surface, wpm: float, acc: float, timer: float, progress: float):
-    font = pygame.font.Font(None, 32)
+
+def draw_hud(surface: pygame.Surface, wpm: float, acc: float, timer: float, progress: float) -> pygame.Rect:
     width, _ = surface.get_size()
 
     # Background bar
     bg_rect = pygame.Rect(0, 0, width, HUD_HEIGHT)
     pygame.draw.rect(surface, (20, 20, 20), bg_rect)
 
-    text = f"WPM: {wpm:.1f}    ACC: {acc:.1f}%    TIME: {timer:0.1f}s"
-    text_surf = font.render(text, True, WHITE)
-    surface.blit(text_surf, (20, 20))
+    # Each field is cached by its formatted text, so one is only re-rendered
+    # when its displayed value changes.
+    gap = get_font(HUD_FONT_SIZE).size("    ")[0]
+    x = 20
+    for field in (f"WPM: {wpm:.1f}", f"ACC: {acc:.1f}%", f"TIME: {timer:0.1f}s"):
+        text_surf = render_text(field, HUD_FONT_SIZE, WHITE)
+        surface.blit(text_surf, (x, 20))
+        x += text_surf.get_width() + gap
 
     # Progress bar
     bar_margin = 20
@@ -23,3 +30,13 @@ def draw_hud(surface: pygame.Surface, wpm: float, acc: float, timer: float, prog
     clamped = max(0.0, min(1.0, progress))
     fill_rect = pygame.Rect(bar_margin, HUD_HEIGHT - 25, int(bar_width * clamped), bar_height)
     pygame.draw.rect(surface, GREEN, fill_rect)
+    return bg_rect
+
+
+def draw_waiting(surface: pygame.Surface) -> pygame.Rect:
+    """Note shown while an endless run waits for its next passage."""
+    width, height = surface.get_size()
+    text_surf = render_text("Loading more text...", 28, WHITE)
+    rect = text_surf.get_rect(bottomright=(width - 20, height - 10))
+    surface.blit(text_surf, rect)
+    return rect
@@ -1,12 +1,14 @@
-import json
 import os
-from collections import Counter
+import random
+import threading
+from collections import deque
 from itertools import cycle
 from pathlib import Path
-from typing import Iterable
-from urllib import request, error
+from queue import Empty, Full, Queue
+from typing import Iterable, Iterator
 
-from persistence import load_recent_sessions
+from analytics import slow_ngrams
+from persistence import weakest_keys
 
 
 def load_env_file(path: str | os.PathLike[str] = ".env") -> None:
@@ -21,36 +23,67 @@ def load_env_file(path: str | os.PathLike[str] = ".env") -> None:
             os.environ[key.strip()] = val.strip().strip('"').strip("'")
 
 
-def top_error_keys(limit_sessions: int = 10, top_k: int = 8) -> list[str]:
-    sessions = load_recent_sessions("data/sessions", limit_sessions)
-    counter: Counter[str] = Counter()
-    for sess in sessions:
-        errors = sess.get("errors", {})
-        for key, count in errors.items():
-            counter[key] += count
-    return [k for k, _ in counter.most_common(top_k)]
+def top_error_keys(top_k: int = 8) -> list[str]:
+    """Keys with the highest error rate in the persisted per-key aggregate."""
+    return [k for k, _ in weakest_keys("data/sessions", top_k)]
 
 
-def synthesize_drill_text(error_keys: Iterable[str], length: int = 400) -> str:
-    """Fallback generator: repeat weak keys in short, vowel-mixed fragments."""
+def drill_targets() -> tuple[list[str], list[str]]:
+    """Weak keys and slow n-grams that drills should focus on."""
+    return top_error_keys(), slow_ngrams("data/sessions")
+
+
+def synthesize_drill_text(error_keys: Iterable[str], length: int = 400, ngrams: Iterable[str] = ()) -> str:
+    """Fallback generator: repeat weak keys and slow n-grams in short, vowel-mixed fragments."""
     keys = [k for k in error_keys if k.strip()]
-    if not keys:
+    grams = [g for g in ngrams if g.strip()]
+    if not keys and not grams:
         return ""
     vowels = "aeiou"
     output = []
-    key_cycle = cycle(keys)
+    key_cycle = cycle(keys) if keys else None
+    gram_cycle = cycle(grams) if grams else None
     vowel_cycle = cycle(vowels)
     spacer_cycle = cycle([" ", " ", "  "])
-    while len("".join(output)) < length:
-        key_char = next(key_cycle)
-        frag = f"{key_char}{next(vowel_cycle)}{key_char}"
+    size = 0
+    use_gram = False
+    vowel_first = True
+    while size < length:
+        if gram_cycle and (use_gram or not key_cycle):
+            gram = next(gram_cycle)
+            vowel = next(vowel_cycle)
+            # Alternate the vowel side so each transition is entered and left.
+            frag = f"{vowel}{gram}" if vowel_first else f"{gram}{vowel}"
+            vowel_first = not vowel_first
+        else:
+            key_char = next(key_cycle)
+            frag = f"{key_char}{next(vowel_cycle)}{key_char}"
+        use_gram = not use_gram
+        spacer = next(spacer_cycle)
         output.append(frag)
-        output.append(next(spacer_cycle))
+        output.append(spacer)
+        size += len(frag) + len(spacer)
     return "".join(output)[:length].strip()
 
 
+def local_drill_text(
+    error_keys: list[str], length: int = 400, ngrams: Iterable[str] = (), seed: int | None = None
+) -> str:
+    """Offline drill: real corpus sentences dense in the targets, else synthesized fragments."""
+    from corpus import get_corpus
+
+    grams = list(ngrams)
+    try:
+        text = get_corpus().passage([*error_keys, *grams], length=length, seed=seed)
+    except OSError:
+        text = ""
+    return text or synthesize_drill_text(error_keys, length=length, ngrams=grams)
+
+
 def _call_openai(prompt: str, api_key: str, max_tokens: int = 400, model: str = "gpt-4o-mini") -> str | None:
-    url = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1") + "/chat/completions"
+    # Imported on first use: the HTTP/TLS stack is only needed for remote drills.
+    from drill_backend import get_backend
+
     payload = {
         "model": model,
         "messages": [
@@ -68,41 +101,191 @@ def _call_openai(prompt: str, api_key: str, max_tokens: int = 400, model: str =
         "temperature": 0.7,
         "max_tokens": max_tokens,
     }
-    data = json.dumps(payload).encode()
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-    req = request.Request(url, data=data, headers=headers)
-    try:
-        with request.urlopen(req, timeout=25) as resp:
-            body = resp.read().decode()
-        parsed = json.loads(body)
-        return parsed["choices"][0]["message"]["content"].strip()
-    except Exception:
-        return None
+    return get_backend().chat(payload, api_key)
 
 
-def generate_drill_text(length: int = 400) -> str | None:
+def remote_drill_text(length: int = 400) -> str | None:
+    """Ask the remote model for a drill; None when no API key is set or the call fails."""
     load_env_file()
-    sessions = load_recent_sessions("data/sessions", 15)
-    errors = top_error_keys()
-    if not errors:
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
         return None
+    summary = []
+    weak = weakest_keys("data/sessions", 10)
+    summary.append("Top weak keys with error rates: " + ", ".join(f"{k}:{rate:.0%}" for k, rate in weak))
+    grams = slow_ngrams("data/sessions")
+    if grams:
+        summary.append("Slowest letter sequences to practice: " + ", ".join(repr(g) for g in grams))
+    summary.append(f"Target length ~{length} characters.")
+    prompt = "\n".join(summary)
+    ai_text = _call_openai(prompt, api_key, max_tokens=600)
+    if ai_text:
+        # strip leading/trailing whitespace and limit length
+        return ai_text.replace("\n", " ").strip()[:length]
+    return None
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key:
-        summary = []
-        total_errors = Counter()
-        for sess in sessions:
-            for k, v in sess.get("errors", {}).items():
-                total_errors[k] += v
-        summary.append("Top weak keys with counts: " + ", ".join(f"{k}:{v}" for k, v in total_errors.most_common(10)))
-        summary.append(f"Target length ~{length} characters.")
-        prompt = "\n".join(summary)
-        ai_text = _call_openai(prompt, api_key, max_tokens=600)
-        if ai_text:
-            # strip leading/trailing whitespace and limit length
-            return ai_text.replace("\n", " ").strip()[:length]
-
-    return synthesize_drill_text(errors, length=length)
+
+ENDLESS_CHUNK = 600
+# Used when there is no history yet: the most common English letters.
+DEFAULT_TARGETS = list("etaoinshr")
+
+
+def endless_feed(length: int = ENDLESS_CHUNK, retarget_every: int = 5) -> Iterator[str]:
+    """Never-ending local drill passages, re-reading the weak-key profile every few chunks."""
+    n = random.randrange(1 << 30)
+    keys: list[str] = []
+    grams: list[str] = []
+    for i in cycle(range(retarget_every)):
+        if i == 0:
+            keys, grams = drill_targets()
+            if not keys and not grams:
+                keys = DEFAULT_TARGETS
+        text = local_drill_text(keys, length=length, ngrams=grams, seed=n)
+        n += 1
+        yield text + "\n"
+
+
+class Prefetcher:
+    """Iterates `chunks` on a daemon thread, keeping up to `depth` items ready.
+
+    `poll` never blocks: it returns the next ready item, or None if the
+    producer is behind. `done` turns True once every item has been handed out.
+    Closing stops the producer at its next item.
+    """
+
+    _END = object()
+
+    def __init__(self, chunks: Iterable[str], depth: int = 2):
+        self.done = False
+        self._queue: Queue = Queue(maxsize=depth)
+        self._stop = threading.Event()
+        threading.Thread(target=self._produce, args=(chunks,), daemon=True).start()
+
+    def poll(self) -> str | None:
+        if self.done:
+            return None
+        try:
+            item = self._queue.get_nowait()
+        except Empty:
+            return None
+        if item is self._END:
+            self.done = True
+            return None
+        return item
+
+    def close(self) -> None:
+        self._stop.set()
+        self.done = True
+
+    def _put(self, item: object) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.2)
+                return True
+            except Full:
+                pass
+        return False
+
+    def _produce(self, chunks: Iterable[str]) -> None:
+        try:
+            for item in chunks:
+                if not self._put(item):
+                    return
+        except Exception:
+            pass
+        self._put(self._END)
+
+
+class DrillJob:
+    """Generates a drill on a daemon thread so the render loop keeps running.
+
+    The local fallback is published first (`local_ready`), then the remote text
+    if one is configured (`done`). Cancelling only discards the results; a
+    remote request already in flight is left to time out on its own.
+    """
+
+    def __init__(self, length: int = 400):
+        self.length = length
+        self.local_text: str | None = None
+        self.remote_text: str | None = None
+        self.local_ready = threading.Event()
+        self.done = threading.Event()
+        self.cancelled = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+    def _run(self) -> None:
+        try:
+            errors, grams = drill_targets()
+            if errors or grams:
+                self.local_text = local_drill_text(errors, length=self.length, ngrams=grams) or None
+            self.local_ready.set()
+            if (errors or grams) and not self.cancelled:
+                self.remote_text = remote_drill_text(self.length)
+        except Exception:
+            pass
+        finally:
+            self.local_ready.set()
+            self.done.set()
+
+
+class DrillPool:
+    """Pre-generated drills for the current weak-key / slow n-gram profile.
+
+    `take` never blocks. `refill_async` regenerates in the background and
+    drops the pool whenever the profile has changed since it was
+    filled, so it is called after every saved session.
+    """
+
+    def __init__(self, length: int = 400, size: int = 3):
+        self.length = length
+        self.size = size
+        self.profile: tuple[tuple[str, ...], tuple[str, ...]] = ((), ())
+        self._texts: deque[str] = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+
+    def take(self) -> str | None:
+        try:
+            return self._texts.popleft()
+        except IndexError:
+            return None
+
+    def refill_async(self) -> None:
+        with self._lock:
+            if self._refilling:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, daemon=True).start()
+
+    def _refill(self) -> None:
+        try:
+            keys, grams = drill_targets()
+            profile = (tuple(keys), tuple(grams))
+            if profile != self.profile:
+                self._texts.clear()
+                self.profile = profile
+            if not keys and not grams:
+                return
+            # Fresh seeds each refill, so the same profile doesn't always yield the same drills.
+            base = random.randrange(1 << 32)
+            n = 0
+            while len(self._texts) < self.size and profile == self.profile:
+                text = remote_drill_text(self.length)
+                if not text or text in self._texts:
+                    # Rotate the targets so pooled local drills differ from each other.
+                    k = n % len(keys) if keys else 0
+                    g = n % len(grams) if grams else 0
+                    text = local_drill_text(
+                        keys[k:] + keys[:k], length=self.length, ngrams=grams[g:] + grams[:g], seed=base + n
+                    )
+                if text:
+                    self._texts.append(text)
+                n += 1
+        except Exception:
+            pass
+        finally:
+            with self._lock:
+                self._refilling = False
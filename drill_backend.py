@@ -0,0 +1,199 @@
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from queue import Empty, LifoQueue
+from typing import Any
+from urllib.parse import urlsplit
+
+from persistence import write_atomic
+
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+CACHE_PATH = "data/cache/drill_responses.json"
+
+# Status codes worth retrying; anything else in 4xx is treated as final.
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class DrillBackend:
+    """Chat-completions client for remote drills.
+
+    Keeps idle keep-alive connections for reuse, retries transient failures
+    with exponential backoff, uses a short connect timeout and a longer read
+    timeout, and caches responses on disk keyed by model and messages with a
+    TTL and LRU eviction. Point `OPENAI_API_BASE` at a local server to test.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        cache_path: str | os.PathLike[str] | None = CACHE_PATH,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 25.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        cache_ttl: float = 24 * 3600,
+        cache_size: int = 128,
+        pool_size: int = 2,
+    ):
+        self.base_url = base_url or os.getenv("OPENAI_API_BASE", DEFAULT_API_BASE)
+        parts = urlsplit(self.base_url)
+        self.scheme = parts.scheme or "https"
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._idle: LifoQueue[http.client.HTTPConnection] = LifoQueue(maxsize=pool_size)
+        self._cache_lock = threading.Lock()
+        self._cache: dict[str, dict[str, Any]] | None = None
+
+    def chat(self, payload: dict[str, Any], api_key: str) -> str | None:
+        """Return the first choice's message content, or None if the call fails."""
+        key = self._cache_key(payload)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        body = json.dumps(payload).encode()
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {api_key}",
+            "Connection": "keep-alive",
+        }
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                status, data = self._post(self.path_prefix + "/chat/completions", body, headers)
+            except (OSError, http.client.HTTPException):
+                continue
+            if status in _RETRY_STATUS:
+                continue
+            if status != 200:
+                return None
+            try:
+                text = json.loads(data)["choices"][0]["message"]["content"].strip()
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                return None
+            self._cache_put(key, text)
+            return text
+        return None
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                return
+
+    def _post(self, path: str, body: bytes, headers: dict[str, str]) -> tuple[int, bytes]:
+        conn = self._acquire()
+        try:
+            if conn.sock is None:
+                conn.connect()
+            # The constructor timeout only bounded connect; reads get their own.
+            conn.sock.settimeout(self.read_timeout)
+            conn.request("POST", path, body=body, headers=headers)
+            resp = conn.getresponse()
+            data = resp.read()
+        except BaseException:
+            conn.close()
+            raise
+        if resp.will_close:
+            conn.close()
+        else:
+            self._release(conn)
+        return resp.status, data
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+        if self.scheme == "http":
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+        return http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout)
+
+    def _release(self, conn: http.client.HTTPConnection) -> None:
+        try:
+            self._idle.put_nowait(conn)
+        except Exception:
+            conn.close()
+
+    def _cache_key(self, payload: dict[str, Any]) -> str:
+        keyed = {"model": payload.get("model"), "messages": payload.get("messages")}
+        return hashlib.sha256(json.dumps(keyed, sort_keys=True).encode()).hexdigest()
+
+    def _load_cache(self) -> dict[str, dict[str, Any]]:
+        if self._cache is None:
+            self._cache = {}
+            if self.cache_path and self.cache_path.exists():
+                try:
+                    with self.cache_path.open("r", encoding="utf-8") as f:
+                        self._cache = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._cache
+
+    def _cache_get(self, key: str) -> str | None:
+        if not self.cache_path:
+            return None
+        with self._cache_lock:
+            cache = self._load_cache()
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            now = time.time()
+            if now - entry["created"] > self.cache_ttl:
+                del cache[key]
+                self._save_cache()
+                return None
+            entry["used"] = now
+            return entry["text"]
+
+    def _cache_put(self, key: str, text: str) -> None:
+        if not self.cache_path:
+            return
+        with self._cache_lock:
+            cache = self._load_cache()
+            now = time.time()
+            cache[key] = {"text": text, "created": now, "used": now}
+            if len(cache) > self.cache_size:
+                by_use = sorted(cache, key=lambda k: cache[k]["used"])
+                for old in by_use[: len(cache) - self.cache_size]:
+                    del cache[old]
+            self._save_cache()
+
+    def _save_cache(self) -> None:
+        if not self.cache_path or self._cache is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(self.cache_path, json.dumps(self._cache).encode("utf-8"))
+        except OSError:
+            pass
+
+
+_backend: DrillBackend | None = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> DrillBackend:
+    """Shared backend for the configured OPENAI_API_BASE."""
+    global _backend
+    with _backend_lock:
+        base = os.getenv("OPENAI_API_BASE", DEFAULT_API_BASE)
+        if _backend is None or _backend.base_url != base:
+            if _backend is not None:
+                _backend.close()
+            _backend = DrillBackend(base)
+        return _backend
@@ -0,0 +1,34 @@
+"""Shared font objects and a cache of rendered UI strings."""
+from collections import OrderedDict
+
+import pygame
+
+TEXT_CACHE_SIZE = 256
+
+# Loaded fonts keyed by (face, size); a face of None is pygame's default font.
+_fonts: dict[tuple[str | None, int], pygame.font.Font] = {}
+# Rendered strings keyed by (face, size, text, color), least recently used first.
+_text_cache: "OrderedDict[tuple, pygame.Surface]" = OrderedDict()
+
+
+def get_font(size: int, face: str | None = None) -> pygame.font.Font:
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.Font(face, size)
+        _fonts[key] = font
+    return font
+
+
+def render_text(text: str, size: int, color, face: str | None = None) -> pygame.Surface:
+    """Antialiased `text`, rendered once and then served from the cache."""
+    key = (face, size, text, tuple(color))
+    surface = _text_cache.get(key)
+    if surface is not None:
+        _text_cache.move_to_end(key)
+        return surface
+    surface = get_font(size, face).render(text, True, color)
+    _text_cache[key] = surface
+    if len(_text_cache) > TEXT_CACHE_SIZE:
+        _text_cache.popitem(last=False)
+    return surface
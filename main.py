@@ -1,17 +1,34 @@
+import math
 import time
 import pygame
 import sys
 from datetime import datetime
 from constants import *
 from text_stream import TextStream
+from text_source import FeedSource
 from cursor import Cursor
 from typing_class import TypingController
-from scoring import gross_wpm, accuracy, per_key_errors
-from draw import draw_hud
+from draw import draw_hud, draw_waiting
 from results import draw_results
-from menu import Menu, draw_menu
-from persistence import save_session
-from drill import generate_drill_text
+from menu import Menu, draw_menu, draw_preparing
+from persistence import save_session, weakest_keys
+from drill import DrillJob, DrillPool, Prefetcher, endless_feed
+from profiler import FrameProfiler
+from analytics import ngram_stats
+
+drill_pool = DrillPool(length=500)
+# perf_counter times of startup milestones, read by `bench.py --startup`:
+# first_frame, run_requested (the input that started the first run) and
+# first_typeable (that run's first presented frame).
+startup_marks: dict[str, float] = {}
+# The HUD timer shows tenths of a second.
+TIMER_STEP_SEC = 0.1
+# How often a background drill job (or a late endless passage) is checked while one is pending.
+JOB_POLL_SEC = 0.05
+# Endless runs keep only this much keystroke history in memory.
+ENDLESS_UNDO_LIMIT = 2_000
+ENDLESS_JOURNAL_LIMIT = 200_000
+profiler = FrameProfiler(enabled=PROFILE)
 
 drawable = pygame.sprite.Group()
 updatable = pygame.sprite.Group()
@@ -22,12 +39,19 @@ TextStream.containers = (drawable, ) # type: ignore[attr-defined]
 def start_run(mode: str, text_path: str | None, drill_text: str | None = None):
     drawable.empty()
     updatable.empty()
+    history_limits = {}
+    if mode == "endless":
+        textstream = TextStream(source=FeedSource(Prefetcher(endless_feed())), rolling=True)
+        history_limits = {"undo_limit": ENDLESS_UNDO_LIMIT, "journal_limit": ENDLESS_JOURNAL_LIMIT}
+    else:
+        textstream = TextStream(filepath=text_path, content=drill_text)
     cursor = Cursor()
-    textstream = TextStream(filepath=text_path, content=drill_text)
-    typing_controller = TypingController(textstream, cursor)
+    cursor.background = textstream.surface
+    typing_controller = TypingController(textstream, cursor, **history_limits)
     caret_x, caret_y, caret_height = textstream.caret_for_index(0)
     cursor.move_to(caret_x, caret_y, caret_height)
-    start_time = time.time()
+    profiler.reset_trace()
+    start_time = time.perf_counter()
     return {
         "cursor": cursor,
         "textstream": textstream,
@@ -37,67 +61,157 @@ def start_run(mode: str, text_path: str | None, drill_text: str | None = None):
         "acc": 100.0,
         "last_metrics_update": start_time,
         "ended": False,
+        # An endless run is waiting for its next passage.
+        "waiting": False,
         "mode": mode,
         "text_path": text_path,
         "drill_text": drill_text,
     }
 
 
+def begin_drill():
+    """Start a run on a pooled drill if one is ready, else a DrillJob to wait on."""
+    drill_text = drill_pool.take()
+    if drill_text:
+        drill_pool.refill_async()
+        return start_run("drill", None, drill_text), None
+    return None, DrillJob(length=500)
+
+
 def finalize_run(run_state, elapsed_clamped: float):
-    final_wpm = gross_wpm(run_state["typing_controller"].keystrokes, max(0.001, elapsed_clamped))
-    final_acc = accuracy(run_state["typing_controller"].keystrokes)
-    total_keys = len([k for k in run_state["typing_controller"].keystrokes if k.expected is not None])
-    correct_keys = len(
-        [k for k in run_state["typing_controller"].keystrokes if k.expected is not None and k.correct]
-    )
-    errors = per_key_errors(run_state["typing_controller"].keystrokes)
+    stats = run_state["typing_controller"].stats
     results = {
-        "wpm": final_wpm,
-        "acc": final_acc,
+        **stats.summary(elapsed_clamped),
         "elapsed_sec": elapsed_clamped,
         "mode": run_state["mode"],
-        "total_keys": total_keys,
-        "correct_keys": correct_keys,
-        "errors": errors,
         "text_path": run_state.get("text_path"),
     }
     session_payload = {
         **results,
         "timestamp": datetime.utcnow().isoformat() + "Z",
     }
-    save_session("data/sessions", session_payload)
+    if run_state.get("drill_text"):
+        session_payload["drill_text"] = run_state["drill_text"]
+    journal = run_state["typing_controller"].journal
+    session_payload.update(ngram_stats(journal))
+    save_session("data/sessions", session_payload, journal.to_bytes(origin=run_state["start_time"]))
+    if profiler.enabled:
+        profiler.dump_chrome_trace(f"data/traces/trace_{session_payload['timestamp'].replace(':', '-')}.json")
+    run_state["textstream"].save_layout()
+    run_state["textstream"].close()
+    drill_pool.refill_async()
+    results["weak_keys"] = weakest_keys("data/sessions", 5)
     return results
 
 
+def next_wakeup(scene: str, run_state, drill_job, duration: float, menu=None) -> float | None:
+    """Seconds until the scene changes on its own, or None to sleep until input."""
+    if scene == "menu":
+        return JOB_POLL_SEC if menu and menu.stats_pending() else None
+    if scene == "preparing":
+        return JOB_POLL_SEC if drill_job else None
+    if scene != "typing" or not run_state or run_state["ended"]:
+        return None
+    now = time.perf_counter()
+    elapsed = now - run_state["start_time"]
+    # hud_refresh_sec = 0 means every frame, paced at the configured fps.
+    hud_period = HUD_REFRESH_SEC if HUD_REFRESH_SEC > 0 else 1 / max(1, FPS)
+    waits = [
+        run_state["cursor"].blink_rate,
+        TIMER_STEP_SEC - elapsed % TIMER_STEP_SEC,
+        run_state["last_metrics_update"] + hud_period - now,
+    ]
+    if run_state["mode"] == "timed":
+        waits.append(duration - elapsed)
+    if run_state.get("drill_job") or run_state["textstream"].waiting():
+        waits.append(JOB_POLL_SEC)
+    return max(0.0, min(waits))
+
+
+def wait_events(timeout: float | None) -> list[tuple[pygame.event.Event, float]]:
+    """Pending events, each with the perf_counter time it was taken off the queue.
+
+    Events are dequeued one at a time so each gets its own stamp. If there are
+    none, blocks up to `timeout` seconds (None = until input), so input that
+    arrives while idle is stamped as soon as SDL delivers it.
+    """
+    stamped = []
+    event = pygame.event.poll()
+    if event.type == pygame.NOEVENT and (timeout is None or timeout > 0):
+        event = pygame.event.wait() if timeout is None else pygame.event.wait(math.ceil(timeout * 1000))
+    while event.type != pygame.NOEVENT:
+        stamped.append((event, time.perf_counter()))
+        event = pygame.event.poll()
+    return stamped
+
+
 def main():
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     clock = pygame.time.Clock()
     dt = 0
+    last_frame = time.perf_counter()
     duration = TIMED_DURATION_SEC
     menu = Menu()
-    current_scene = "menu"  # menu, typing, results
+    current_scene = "menu"  # menu, preparing, typing, results
     run_state = None
     results_data = None
+    drill_job = None
+    drill_fallback_path = None
+    drawn_scene = None
 
     while True:
-        for event in pygame.event.get():
+        # Sleep until input or the next scheduled change (caret blink, HUD
+        # timer, drill poll); the profiler needs steady frames, so it spins.
+        if profiler.enabled or current_scene != drawn_scene:
+            timeout = 0.0
+        else:
+            timeout = next_wakeup(current_scene, run_state, drill_job, duration, menu)
+        events = wait_events(timeout)
+        profiler.begin_frame()
+        for event, arrival in events:
             if event.type == pygame.QUIT:
                 return
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+                if run_state:
+                    run_state["textstream"].invalidate()
+                continue
             if current_scene == "typing" and run_state and not run_state["ended"]:
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                    return
-                run_state["typing_controller"].handle_event(event)
+                    if run_state["mode"] != "endless":
+                        return
+                    # Endless runs have no natural end; Esc finishes and scores them.
+                    run_state["ended"] = True
+                    continue
+                if event.type == pygame.KEYDOWN:
+                    if event.key != pygame.K_BACKSPACE and run_state["textstream"].waiting():
+                        # Nothing to type against until the next passage arrives.
+                        continue
+                    profiler.mark_input(arrival)
+                run_state["typing_controller"].handle_event(event, arrival)
+            elif current_scene == "preparing":
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    if drill_job:
+                        drill_job.cancel()
+                    drill_job = None
+                    current_scene = "menu"
             elif current_scene == "results":
                 if event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_r:
-                        if run_state:
-                            new_drill = None
-                            if run_state["mode"] == "drill":
-                                new_drill = generate_drill_text(length=500)
-                            run_state = start_run(run_state["mode"], run_state.get("text_path"), new_drill)
                         results_data = None
-                        current_scene = "typing"
+                        if run_state and run_state["mode"] == "drill":
+                            drill_fallback_path = run_state.get("text_path") or "data/texts/sample1.txt"
+                            pooled_run, drill_job = begin_drill()
+                            if pooled_run:
+                                run_state = pooled_run
+                                current_scene = "typing"
+                            else:
+                                current_scene = "preparing"
+                        else:
+                            if run_state:
+                                run_state = start_run(run_state["mode"], run_state.get("text_path"))
+                            current_scene = "typing"
                     elif event.key == pygame.K_RETURN:
                         current_scene = "menu"
                     elif event.key == pygame.K_ESCAPE:
@@ -105,20 +219,45 @@ def main():
             elif current_scene == "menu":
                 selection = menu.handle_event(event)
                 if selection:
-                    drill_text = None
                     text_path = selection.get("text_path")
                     mode = selection["mode"]
-                    if mode == "drill":
-                        drill_text = generate_drill_text(length=500)
-                        if not drill_text:
-                            text_path = text_path or "data/texts/sample1.txt"
-                    run_state = start_run(mode, text_path, drill_text)
                     results_data = None
-                    current_scene = "typing"
+                    if mode == "drill":
+                        drill_fallback_path = text_path or "data/texts/sample1.txt"
+                        pooled_run, drill_job = begin_drill()
+                        if pooled_run:
+                            run_state = pooled_run
+                            current_scene = "typing"
+                        else:
+                            current_scene = "preparing"
+                    else:
+                        startup_marks.setdefault("run_requested", arrival)
+                        run_state = start_run(mode, text_path)
+                        current_scene = "typing"
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
                     return
 
-        now = time.time()
+        profiler.lap("events")
+
+        if current_scene == "preparing" and drill_job and drill_job.local_ready.is_set():
+            # Start on the local drill right away; the remote one may replace it below.
+            drill_text = drill_job.local_text
+            run_state = start_run("drill", None if drill_text else drill_fallback_path, drill_text)
+            run_state["drill_job"] = drill_job if drill_text else None
+            drill_job = None
+            current_scene = "typing"
+
+        if current_scene == "typing" and run_state and run_state.get("drill_job"):
+            job = run_state["drill_job"]
+            if run_state["typing_controller"].keystrokes:
+                job.cancel()
+                run_state["drill_job"] = None
+            elif job.done.is_set():
+                run_state["drill_job"] = None
+                if job.remote_text and not job.cancelled:
+                    run_state = start_run("drill", None, job.remote_text)
+
+        now = time.perf_counter()
         elapsed = now - run_state["start_time"] if run_state else 0
         elapsed_clamped = elapsed
 
@@ -132,41 +271,79 @@ def main():
                 progress = min(1.0, elapsed_clamped / duration) if duration > 0 else 1.0
                 timer_value = remaining
             else:
-                if run_state["textstream"].ind >= len(run_state["textstream"].content):
+                if run_state["textstream"].finished():
                     run_state["ended"] = True
-                progress = (
-                    run_state["textstream"].ind / len(run_state["textstream"].content)
-                    if run_state["textstream"].content
-                    else 1.0
-                )
+                progress = run_state["textstream"].progress()
                 timer_value = elapsed_clamped
 
             updatable.update(dt)
-            screen.fill("black")
-            for thing in drawable:
-                thing.draw(screen)
-
-            if now - run_state["last_metrics_update"] >= 5:
-                run_state["wpm"] = gross_wpm(
-                    run_state["typing_controller"].keystrokes, max(0.001, elapsed_clamped)
-                )
-                run_state["acc"] = accuracy(run_state["typing_controller"].keystrokes)
+            profiler.lap("update")
+            # Only changed cells, the caret and the HUD are repainted each frame.
+            waiting = run_state["textstream"].waiting()
+            if run_state["waiting"] and not waiting:
+                run_state["textstream"].invalidate()
+            run_state["waiting"] = waiting
+            dirty_rects = run_state["textstream"].draw(screen)
+            if waiting:
+                dirty_rects.append(draw_waiting(screen))
+            cursor = run_state["cursor"]
+            if cursor.rect.collidelist(dirty_rects) != -1:
+                cursor.dirty = True
+            dirty_rects.extend(cursor.draw(screen))
+            profiler.lap("draw")
+
+            if now - run_state["last_metrics_update"] >= HUD_REFRESH_SEC:
+                stats = run_state["typing_controller"].stats
+                run_state["wpm"] = stats.rolling_wpm(now, elapsed_clamped)
+                run_state["acc"] = stats.accuracy()
                 run_state["last_metrics_update"] = now
-            draw_hud(screen, run_state["wpm"], run_state["acc"], timer_value, progress)
+            dirty_rects.append(draw_hud(screen, run_state["wpm"], run_state["acc"], timer_value, progress))
+            profiler.lap("hud")
 
             if run_state["ended"]:
                 results_data = finalize_run(run_state, elapsed_clamped)
                 current_scene = "results"
 
-        elif current_scene == "results":
+        # Static scenes are only redrawn after input or on entry, and the
+        # menu when file stats computed in the background arrive.
+        redraw = bool(events) or current_scene != drawn_scene or profiler.enabled
+        if current_scene == "menu" and menu.stats_updated():
+            redraw = True
+        if current_scene == "results" and redraw:
             screen.fill("black")
             if results_data:
                 draw_results(screen, results_data)
-        elif current_scene == "menu":
+            profiler.lap("draw")
+        elif current_scene == "menu" and redraw:
             draw_menu(screen, menu)
+            profiler.lap("draw")
+        elif current_scene == "preparing" and redraw:
+            draw_preparing(screen)
+            profiler.lap("draw")
 
-        dt = clock.tick(FPS) / 1000  # Delta time in seconds.
-        pygame.display.flip()
+        overlay_rect = profiler.draw_overlay(screen)
+        if profiler.enabled:
+            clock.tick(FPS)
+        frame_time = time.perf_counter()
+        dt = frame_time - last_frame  # Delta time in seconds.
+        last_frame = frame_time
+        profiler.lap("sleep")
+        if current_scene == "typing":
+            if overlay_rect:
+                dirty_rects.append(overlay_rect)
+            if dirty_rects:
+                pygame.display.update(dirty_rects)
+        elif redraw:
+            pygame.display.flip()
+        if drawn_scene is None:
+            startup_marks["first_frame"] = time.perf_counter()
+            # Background drill generation waits until the window is up.
+            drill_pool.refill_async()
+        if current_scene == "typing" and "run_requested" in startup_marks:
+            startup_marks.setdefault("first_typeable", time.perf_counter())
+        drawn_scene = current_scene
+        profiler.lap("flip")
+        profiler.end_frame()
 
 
 if __name__ == "__main__":
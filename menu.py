@@ -1,24 +1,31 @@
 import os
 from pathlib import Path
 import pygame
+from catalog import Catalog
 from constants import HUD_HEIGHT, WHITE, GREEN
+from fonts import get_font, render_text
+
+FILE_PAGE_SIZE = 8
 
 
 class Menu:
     def __init__(self, texts_dir: str = "data/texts"):
-        self.options = [("Timed", "timed"), ("Fixed Text", "fixed"), ("Drill", "drill")]
+        self.options = [("Timed", "timed"), ("Fixed Text", "fixed"), ("Drill", "drill"), ("Endless", "endless")]
         self.selected_idx = 0
         self.stage = "mode"  # mode or file
         self.texts_dir = Path(texts_dir)
-        self.text_files = sorted([p for p in self.texts_dir.glob("*.txt") if p.is_file()])
+        self.catalog = Catalog(self.texts_dir)
+        self.text_files = self.catalog.paths
         self.text_idx = 0
+        self.text_scroll = 0
+        self._stats_version = self.catalog.version
 
     def handle_event(self, event: pygame.event.Event):
         if event.type != pygame.KEYDOWN:
             return None
 
         if self.stage == "mode":
-            idx_from_num = {pygame.K_1: 0, pygame.K_2: 1, pygame.K_3: 2}
+            idx_from_num = {pygame.K_1: 0, pygame.K_2: 1, pygame.K_3: 2, pygame.K_4: 3}
             if event.key in idx_from_num:
                 self.selected_idx = idx_from_num[event.key]
                 return self._select_current()
@@ -38,16 +45,46 @@ class Menu:
                 self.text_idx = (self.text_idx - 1) % len(self.text_files)
             elif event.key == pygame.K_DOWN:
                 self.text_idx = (self.text_idx + 1) % len(self.text_files)
+            elif event.key == pygame.K_PAGEUP:
+                self.text_idx = max(0, self.text_idx - FILE_PAGE_SIZE)
+            elif event.key == pygame.K_PAGEDOWN:
+                self.text_idx = min(len(self.text_files) - 1, self.text_idx + FILE_PAGE_SIZE)
             elif event.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
                 return {
                     "mode": "fixed",
                     "text_path": str(self.text_files[self.text_idx]),
                 }
+            self._scroll_to_selection()
         return None
 
+    def stats_pending(self) -> bool:
+        """File stats are still being computed or arrived since the last `stats_updated`."""
+        return self.catalog.busy or self.catalog.version != self._stats_version
+
+    def stats_updated(self) -> bool:
+        """True once after new file stats arrive, so the picker is redrawn."""
+        version = self.catalog.version
+        if version == self._stats_version:
+            return False
+        self._stats_version = version
+        return True
+
+    def _scroll_to_selection(self):
+        if self.text_idx < self.text_scroll:
+            self.text_scroll = self.text_idx
+        elif self.text_idx >= self.text_scroll + FILE_PAGE_SIZE:
+            self.text_scroll = self.text_idx - FILE_PAGE_SIZE + 1
+
     def _select_current(self):
         label, mode = self.options[self.selected_idx]
+        if mode == "endless":
+            return {"mode": mode, "text_path": None}
         if mode == "fixed":
+            # Pick up added or edited texts; changed files are re-read in the background.
+            self.catalog.refresh()
+            self.text_files = self.catalog.paths
+            self.text_idx = min(self.text_idx, max(0, len(self.text_files) - 1))
+            self._scroll_to_selection()
             if self.text_files:
                 self.stage = "file"
                 return None
@@ -60,39 +97,66 @@ class Menu:
 
 def draw_menu(screen: pygame.Surface, menu: Menu):
     screen.fill("black")
-    font = pygame.font.Font(None, 48)
-    small = pygame.font.Font(None, 32)
+    line_height = get_font(32).get_height()
 
     y = HUD_HEIGHT + 60
-    title = font.render("KeyCast", True, WHITE)
+    title = render_text("KeyCast", 48, WHITE)
     screen.blit(title, (60, y))
     y += title.get_height() + 20
 
     for i, (label, _) in enumerate(menu.options):
         color = GREEN if i == menu.selected_idx and menu.stage == "mode" else WHITE
         text = f"{i+1}. {label}"
-        surf = small.render(text, True, color)
+        surf = render_text(text, 32, color)
         screen.blit(surf, (80, y))
         y += surf.get_height() + 10
 
     if menu.stage == "file":
         y += 10
-        header = small.render("Choose text file (Enter to select, Esc to go back):", True, WHITE)
+        header = render_text("Choose text file (Enter to select, Esc to go back):", 32, WHITE)
         screen.blit(header, (80, y))
         y += header.get_height() + 8
         if not menu.text_files:
-            screen.blit(small.render("No text files found.", True, WHITE), (100, y))
+            screen.blit(render_text("No text files found.", 32, WHITE), (100, y))
         else:
-            for idx, path in enumerate(menu.text_files):
+            first = menu.text_scroll
+            visible = menu.text_files[first:first + FILE_PAGE_SIZE]
+            for idx, path in enumerate(visible, start=first):
                 color = GREEN if idx == menu.text_idx else WHITE
-                screen.blit(small.render(path.name, True, color), (100, y))
-                y += small.get_height() + 6
+                info = menu.catalog.info(path)
+                label = path.name
+                if info:
+                    label += f"   {info['words']:,} words   difficulty {info['difficulty']:.1f}"
+                elif menu.catalog.busy:
+                    label += "   counting..."
+                screen.blit(render_text(label, 32, color), (100, y))
+                y += line_height + 6
+            if len(menu.text_files) > FILE_PAGE_SIZE:
+                pos = f"{menu.text_idx + 1}/{len(menu.text_files)}  (PgUp/PgDn)"
+                screen.blit(render_text(pos, 32, WHITE), (100, y))
+                y += line_height + 6
+            preview = menu.catalog.preview(menu.text_files[menu.text_idx])
+            if preview:
+                y += 8
+                screen.blit(render_text(preview[:80], 32, WHITE), (100, y))
+                y += line_height + 4
+                if len(preview) > 80:
+                    screen.blit(render_text(preview[80:], 32, WHITE), (100, y))
     else:
         y += 14
         hint_lines = [
-            "Use 1/2/3 or arrows + Enter",
+            "Use 1-4 or arrows + Enter",
             "Esc quits",
         ]
         for line in hint_lines:
-            screen.blit(small.render(line, True, WHITE), (80, y))
-            y += small.get_height() + 6
+            screen.blit(render_text(line, 32, WHITE), (80, y))
+            y += line_height + 6
+
+
+def draw_preparing(screen: pygame.Surface):
+    screen.fill("black")
+    y = HUD_HEIGHT + 40
+    title = render_text("Preparing drill...", 48, WHITE)
+    screen.blit(title, (60, y))
+    y += title.get_height() + 20
+    screen.blit(render_text("Esc to cancel", 32, WHITE), (80, y))
@@ -1,7 +1,34 @@
+import heapq
 import json
 import os
+import re
+import secrets
+import socket
+import tempfile
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
-from typing import Any, Iterable
+from typing import Any, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends stay single writes, but key stats are unlocked.
+    fcntl = None
+
+INDEX_NAME = "index.jsonl"
+KEY_STATS_NAME = "key_stats.json"
+# Each station writes into its own shard, data/sessions/stations/<station>/.
+STATIONS_DIR = "stations"
+LOCK_NAME = ".lock"
+# Overrides the hostname as this machine's station id.
+STATION_ENV = "KEYCAST_STATION"
+# Each saved session scales older per-key counts by this factor.
+KEY_STATS_DECAY = 0.9
+# Pseudo-attempts added to the denominator so rarely typed keys don't dominate.
+ERROR_RATE_PRIOR = 5.0
+# Per-key (and per-n-gram) count fields of a session that are aggregated.
+KEY_STATS_FIELDS = ("errors", "attempts", "ngram_counts", "ngram_latency_ms", "ngram_errors")
+_TAIL_BLOCK = 8192
 
 
 def _safe_filename(timestamp: str) -> str:
@@ -9,36 +36,271 @@ def _safe_filename(timestamp: str) -> str:
     return timestamp.replace(":", "-")
 
 
-def save_session(path: str | os.PathLike[str], session_dict: dict[str, Any]) -> Path:
-    """Persist a single session as a JSON file under the target directory."""
-    target_dir = Path(path)
-    target_dir.mkdir(parents=True, exist_ok=True)
+def station_id() -> str:
+    """This machine's station id: $KEYCAST_STATION, else the hostname."""
+    name = os.getenv(STATION_ENV) or socket.gethostname() or "local"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def write_atomic(file_path: Path, data: bytes) -> None:
+    """Write through a uniquely named temp file and rename it into place.
+
+    Safe with concurrent writers (other threads, processes or stations on a
+    shared data directory): readers see either the old or the new file.
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except OSError:
+            pass
+        raise
+
+
+def save_session(
+    path: str | os.PathLike[str],
+    session_dict: dict[str, Any],
+    keystrokes: bytes | None = None,
+    station: str | None = None,
+) -> Path:
+    """Persist a single session as a JSON file, append it to the index and update key stats.
+
+    `keystrokes` is a serialized KeystrokeLog written next to the JSON file.
+    Files go into the station's shard under a unique name and appear atomically,
+    so any number of stations and processes can share one sessions directory.
+    """
+    station = station or station_id()
+    shard = Path(path) / STATIONS_DIR / station
+    shard.mkdir(parents=True, exist_ok=True)
+    # Create the (empty) index before any session file lands, so nobody rebuilds it from them.
+    os.close(os.open(shard / INDEX_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644))
     ts = session_dict.get("timestamp", "session")
-    filename = f"session_{_safe_filename(ts)}.json"
-    file_path = target_dir / filename
-    with file_path.open("w", encoding="utf-8") as f:
-        json.dump(session_dict, f, indent=2)
+    stem = f"session_{_safe_filename(ts)}_{os.getpid()}_{secrets.token_hex(4)}"
+    filename = f"{stem}.json"
+    file_path = shard / filename
+    session_dict = {**session_dict, "station": station}
+    if keystrokes is not None:
+        keys_name = f"{stem}.keys"
+        write_atomic(shard / keys_name, keystrokes)
+        session_dict["keystrokes_file"] = keys_name
+    write_atomic(file_path, json.dumps(session_dict, indent=2).encode("utf-8"))
+    with _shard_lock(shard):
+        key_stats = _read_key_stats(shard) or _rebuild_key_stats(shard)
+        _append_index(shard, filename, session_dict)
+        _fold_key_stats(key_stats, session_dict)
+        _write_json_atomic(shard / KEY_STATS_NAME, key_stats)
     return file_path
 
 
 def load_recent_sessions(path: str | os.PathLike[str], limit: int = 10) -> list[dict[str, Any]]:
-    """Load the most recent session JSON files from a directory."""
+    """Load the most recent sessions, newest first, merged from every shard's index.
+
+    Only the last `limit` entries of each index are read.
+    """
     target_dir = Path(path)
-    if not target_dir.exists():
+    if not target_dir.exists() or limit <= 0:
         return []
 
+    tails = []
+    for shard in _shards(target_dir):
+        entries = []
+        for line in _tail_lines(_ensure_index(shard), limit):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A torn line from an interrupted append.
+                continue
+            entry.pop("file", None)
+            entries.append(entry)
+        entries.sort(key=_time_key, reverse=True)
+        tails.append(entries)
+    return list(islice(heapq.merge(*tails, key=_time_key, reverse=True), limit))
+
+
+def load_session_keystrokes(path: str | os.PathLike[str], session_dict: dict[str, Any]) -> bytes | None:
+    """Raw keystroke log saved with a session, if there is one."""
+    keys_name = session_dict.get("keystrokes_file")
+    if not keys_name:
+        return None
+    target_dir = Path(path)
+    candidates = [target_dir / keys_name]
+    station = session_dict.get("station")
+    if station:
+        candidates.append(target_dir / STATIONS_DIR / station / keys_name)
+    for keys_path in candidates:
+        try:
+            return keys_path.read_bytes()
+        except OSError:
+            continue
+    return None
+
+
+def load_key_stats(path: str | os.PathLike[str]) -> dict[str, Any]:
+    """Decayed per-key error and attempt counts, maintained by save_session.
+
+    Each shard keeps its own aggregate (built once from its index if missing);
+    the result is their sum.
+    """
+    target_dir = Path(path)
+    stats = _empty_key_stats()
+    if not target_dir.exists():
+        return stats
+    for shard in _shards(target_dir):
+        shard_stats = _read_key_stats(shard)
+        if shard_stats is None:
+            with _shard_lock(shard):
+                shard_stats = _read_key_stats(shard) or _rebuild_key_stats(shard)
+        stats["sessions"] += shard_stats.get("sessions", 0)
+        for name in KEY_STATS_FIELDS:
+            merged = stats[name]
+            for key, value in shard_stats.get(name, {}).items():
+                merged[key] = merged.get(key, 0.0) + value
+    return stats
+
+
+def weakest_keys(path: str | os.PathLike[str], top_k: int = 8) -> list[tuple[str, float]]:
+    """Keys with the highest smoothed error rate, as (key, rate) pairs.
+
+    Keys without recorded attempts (errors only from sessions saved before
+    attempts were tracked) have no meaningful rate and are skipped.
+    """
+    stats = load_key_stats(path)
+    errors = stats.get("errors", {})
+    attempts = stats.get("attempts", {})
+    rates = {
+        key: count / (attempts[key] + ERROR_RATE_PRIOR)
+        for key, count in errors.items()
+        if attempts.get(key, 0.0) > 0
+    }
+    return sorted(rates.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+
+
+def _fold_key_stats(stats: dict[str, Any], session: dict[str, Any]) -> None:
+    for name in KEY_STATS_FIELDS:
+        decayed = {}
+        for key, value in stats.get(name, {}).items():
+            value *= KEY_STATS_DECAY
+            if value >= 0.01:
+                decayed[key] = value
+        for key, count in session.get(name, {}).items():
+            decayed[key] = decayed.get(key, 0.0) + count
+        stats[name] = decayed
+    stats["sessions"] += 1
+
+
+def _empty_key_stats() -> dict[str, Any]:
+    return {"sessions": 0, **{name: {} for name in KEY_STATS_FIELDS}}
+
+
+def _read_key_stats(shard: Path) -> dict[str, Any] | None:
+    try:
+        with (shard / KEY_STATS_NAME).open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _rebuild_key_stats(shard: Path) -> dict[str, Any]:
+    """Fold a shard's whole index into a fresh aggregate and save it; hold the shard lock."""
+    stats = _empty_key_stats()
+    with _ensure_index(shard).open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                _fold_key_stats(stats, json.loads(line))
+            except ValueError:
+                continue
+    _write_json_atomic(shard / KEY_STATS_NAME, stats)
+    return stats
+
+
+def _write_json_atomic(file_path: Path, data: Any) -> None:
+    write_atomic(file_path, json.dumps(data).encode("utf-8"))
+
+
+def _append_index(target_dir: Path, filename: str, session_dict: dict[str, Any]) -> None:
+    line = json.dumps({**session_dict, "file": filename}, separators=(",", ":")) + "\n"
+    # One O_APPEND write per entry, so concurrent readers never see interleaved lines.
+    fd = os.open(target_dir / INDEX_NAME, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _shard_lock(shard: Path) -> Iterator[None]:
+    """Exclusive lock on a shard across processes (a no-op without fcntl)."""
+    with (shard / LOCK_NAME).open("ab") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _shards(target_dir: Path) -> list[Path]:
+    """The legacy top-level directory followed by every station shard."""
+    shards = [target_dir]
+    stations = target_dir / STATIONS_DIR
+    if stations.is_dir():
+        shards.extend(sorted(p for p in stations.iterdir() if p.is_dir()))
+    return shards
+
+
+def _time_key(entry: dict[str, Any]) -> str:
+    # isoformat() drops the fraction when it is zero; pad so strings compare in time order.
+    ts = str(entry.get("timestamp", "")).rstrip("Z")
+    return ts if "." in ts else ts + ".000000"
+
+
+def _ensure_index(target_dir: Path) -> Path:
+    """Return the index path, building it once from existing session files if missing."""
+    index_path = target_dir / INDEX_NAME
+    if index_path.exists():
+        return index_path
+
     json_files: Iterable[Path] = sorted(
         (p for p in target_dir.glob("session_*.json") if p.is_file()),
         key=lambda p: p.stat().st_mtime,
-        reverse=True,
     )
-    sessions: list[dict[str, Any]] = []
+    lines = []
     for file_path in json_files:
         try:
             with file_path.open("r", encoding="utf-8") as f:
-                sessions.append(json.load(f))
+                session = json.load(f)
         except Exception:
             continue
-        if len(sessions) >= limit:
-            break
-    return sessions
+        lines.append(json.dumps({**session, "file": file_path.name}, separators=(",", ":")) + "\n")
+    write_atomic(index_path, "".join(lines).encode("utf-8"))
+    return index_path
+
+
+def _tail_lines(file_path: Path, count: int) -> list[str]:
+    """Return up to `count` non-empty lines from the end of a file, last line first."""
+    lines: list[str] = []
+    with file_path.open("rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b""
+        while pos > 0 and len(lines) < count:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step) + remainder
+            parts = chunk.split(b"\n")
+            # The first part may be a partial line unless we reached the file start.
+            remainder = parts.pop(0) if pos > 0 else b""
+            for part in reversed(parts):
+                if part.strip():
+                    lines.append(part.decode("utf-8"))
+                    if len(lines) >= count:
+                        break
+    return lines
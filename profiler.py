@@ -0,0 +1,127 @@
+import json
+import os
+import time
+from collections import deque
+from pathlib import Path
+
+import pygame
+from constants import WHITE
+from fonts import get_font
+
+PHASES = ("events", "update", "draw", "hud", "sleep", "flip")
+MAX_TRACE_EVENTS = 200_000
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FrameProfiler:
+    """Opt-in per-phase frame timing, input latency overlay and trace export.
+
+    The main loop calls `begin_frame`, then `lap(phase)` after each phase and
+    `end_frame` once the frame has been presented. Every call is a cheap no-op
+    while disabled.
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 240):
+        self.enabled = enabled
+        self.frame_ms: deque[float] = deque(maxlen=history)
+        self.latency_ms: deque[float] = deque(maxlen=history)
+        self.phase_ms = {name: deque(maxlen=history) for name in PHASES}
+        self.trace: list[dict] = []
+        self._origin = time.perf_counter()
+        self._frame_start = 0.0
+        self._last = 0.0
+        self._pending_input: float | None = None
+
+    def toggle(self) -> None:
+        self.enabled = not self.enabled
+        self._pending_input = None
+
+    def begin_frame(self) -> None:
+        if not self.enabled:
+            return
+        self._frame_start = self._last = time.perf_counter()
+
+    def lap(self, phase: str) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phase_ms[phase].append((now - self._last) * 1000)
+        self._add_trace(phase, self._last, now)
+        self._last = now
+
+    def mark_input(self, arrival: float | None = None) -> None:
+        """Note a keypress dequeued at `arrival`; its latency is measured at present time."""
+        if self.enabled and self._pending_input is None:
+            self._pending_input = arrival if arrival is not None else time.perf_counter()
+            self._add_trace("keydown", self._pending_input, None)
+
+    def end_frame(self) -> None:
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        if self._frame_start:
+            # Frame cost without the clock.tick sleep.
+            work = (now - self._frame_start) * 1000
+            sleep = self.phase_ms["sleep"][-1] if self.phase_ms["sleep"] else 0.0
+            self.frame_ms.append(work - sleep)
+            self._add_trace("frame", self._frame_start, now)
+        if self._pending_input is not None:
+            self.latency_ms.append((now - self._pending_input) * 1000)
+            self._add_trace("input_to_pixel", self._pending_input, now)
+            self._pending_input = None
+
+    def draw_overlay(self, screen: pygame.Surface) -> pygame.Rect | None:
+        if not self.enabled:
+            return None
+        frames = sorted(self.frame_ms)
+        latency = sorted(self.latency_ms)
+        means = "  ".join(
+            f"{name} {sum(vals) / len(vals):.2f}" for name, vals in self.phase_ms.items() if vals
+        )
+        lines = [
+            "frame ms p50/p95/p99: "
+            f"{_percentile(frames, 0.5):.2f} / {_percentile(frames, 0.95):.2f} / {_percentile(frames, 0.99):.2f}",
+            f"key->pixel ms p50/p95: {_percentile(latency, 0.5):.2f} / {_percentile(latency, 0.95):.2f}",
+            f"mean ms: {means}",
+        ]
+        # These change every frame, so they bypass the UI text cache.
+        font = get_font(22)
+        surfaces = [font.render(line, True, WHITE) for line in lines]
+        width = max(s.get_width() for s in surfaces) + 16
+        height = sum(s.get_height() + 2 for s in surfaces) + 12
+        sw, sh = screen.get_size()
+        rect = pygame.Rect(sw - width - 10, sh - height - 10, width, height)
+        screen.fill((30, 30, 60), rect)
+        y = rect.y + 6
+        for surf in surfaces:
+            screen.blit(surf, (rect.x + 8, y))
+            y += surf.get_height() + 2
+        return rect
+
+    def reset_trace(self) -> None:
+        self.trace = []
+
+    def dump_chrome_trace(self, path: str | os.PathLike[str]) -> Path | None:
+        """Write collected events in Chrome trace format (chrome://tracing, Perfetto)."""
+        if not self.trace:
+            return None
+        file_path = Path(path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open("w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.trace, "displayTimeUnit": "ms"}, f)
+        return file_path
+
+    def _add_trace(self, name: str, start: float, end: float | None) -> None:
+        if len(self.trace) >= MAX_TRACE_EVENTS:
+            return
+        event = {"name": name, "pid": 1, "tid": 1, "ts": (start - self._origin) * 1e6}
+        if end is None:
+            event.update(ph="i", s="t")
+        else:
+            event.update(ph="X", dur=(end - start) * 1e6)
+        self.trace.append(event)
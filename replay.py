@@ -0,0 +1,100 @@
+"""Deterministic headless replay of recorded sessions.
+
+Feeds a session's saved keystroke journal back through TypingController and
+TextStream as fast as possible and re-scores it with the current rules:
+
+    python3 replay.py data/sessions/session_<timestamp>.json [...]
+"""
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+from cursor import Cursor
+from persistence import load_session_keystrokes
+from text_stream import TextStream
+from typing_class import KeystrokeLog, TypingController
+
+
+def replay_journal(content: str, journal: KeystrokeLog) -> TypingController:
+    """Run a journal through a fresh controller, stamping keys with the recorded times.
+
+    The backspace policy recorded with the journal is used, not the current setting.
+    """
+    if not pygame.font.get_init():
+        pygame.font.init()
+    stream = TextStream(content=content)
+    controller = TypingController(stream, Cursor(), allow_backspace=journal.allow_backspace)
+    for i, (timestamp, cp) in enumerate(zip(journal.timestamps, journal.chars)):
+        if journal.is_backspace(i):
+            event = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="")
+        else:
+            event = pygame.event.Event(pygame.KEYDOWN, key=0, unicode=chr(cp))
+        controller.handle_event(event, timestamp)
+    return controller
+
+
+def session_content(session: dict[str, Any]) -> str | None:
+    """Text the session was typed against: the saved drill or the source file."""
+    if session.get("drill_text"):
+        return session["drill_text"]
+    text_path = session.get("text_path")
+    if not text_path:
+        return None
+    try:
+        with open(text_path, "r") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def rescore_session(session: dict[str, Any], sessions_dir: str | os.PathLike[str] = "data/sessions") -> dict[str, Any] | None:
+    """Replay a saved session and return its results under the current scoring."""
+    data = load_session_keystrokes(sessions_dir, session)
+    content = session_content(session)
+    if data is None or content is None:
+        return None
+    journal = KeystrokeLog.from_bytes(data)
+    controller = replay_journal(content, journal)
+    elapsed = session.get("elapsed_sec") or (journal.timestamps[-1] if len(journal) else 0.0)
+    return {
+        **controller.stats.summary(elapsed),
+        "elapsed_sec": elapsed,
+        "mode": session.get("mode"),
+        "text_path": session.get("text_path"),
+    }
+
+
+def main(argv: list[str]) -> int:
+    if not argv:
+        print(__doc__)
+        return 2
+    for name in argv:
+        session_path = Path(name)
+        with session_path.open("r", encoding="utf-8") as f:
+            session = json.load(f)
+        start = time.perf_counter()
+        results = rescore_session(session, session_path.parent)
+        took = time.perf_counter() - start
+        if results is None:
+            print(f"{name}: no keystroke log or source text", file=sys.stderr)
+            continue
+        print(json.dumps({
+            "session": name,
+            "replay_sec": took,
+            "recorded": {"wpm": session.get("wpm"), "acc": session.get("acc")},
+            "replayed": {"wpm": results["wpm"], "acc": results["acc"]},
+            "results": results,
+        }))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,10 +1,9 @@
 import pygame
 from constants import HUD_HEIGHT, WHITE
+from fonts import render_text
 
 
 def draw_results(screen: pygame.Surface, results: dict):
-    font = pygame.font.Font(None, 46)
-    small = pygame.font.Font(None, 32)
     lines = [
         f"Results ({results['mode']}):",
         f"WPM: {results['wpm']:.1f}",
@@ -14,19 +13,20 @@ def draw_results(screen: pygame.Surface, results: dict):
     errors = sorted(results["errors"].items(), key=lambda kv: kv[1], reverse=True)
     top_errors = ", ".join(f"{k}:{v}" for k, v in errors[:5]) if errors else "None"
     lines.append(f"Top errors: {top_errors}")
+    weak_keys = results.get("weak_keys")
+    if weak_keys:
+        lines.append("Weakest keys overall: " + ", ".join(f"{k}:{rate:.0%}" for k, rate in weak_keys))
     lines.append("R = Retry   Enter = Menu   Esc = Quit")
 
     y = HUD_HEIGHT + 60
     for i, line in enumerate(lines):
-        surf = font.render(line, True, WHITE) if i == 0 else small.render(line, True, WHITE)
+        surf = render_text(line, 46 if i == 0 else 32, WHITE)
         screen.blit(surf, (60, y))
         y += surf.get_height() + 12
 
 
 def draw_menu(screen: pygame.Surface, mode: str):
     screen.fill("black")
-    font = pygame.font.Font(None, 48)
-    small = pygame.font.Font(None, 32)
     lines = [
         "KeyCast",
         f"Mode: {mode}",
@@ -35,6 +35,6 @@ def draw_menu(screen: pygame.Surface, mode: str):
     ]
     y = HUD_HEIGHT + 80
     for i, line in enumerate(lines):
-        surf = font.render(line, True, WHITE) if i == 0 else small.render(line, True, WHITE)
+        surf = render_text(line, 48 if i == 0 else 32, WHITE)
         screen.blit(surf, (60, y))
         y += surf.get_height() + 14
@@ -1,7 +1,10 @@
-from collections import Counter
-from typing import Iterable
+from __future__ import annotations
 
-from typing_class import Keystroke
+from collections import Counter, deque
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from typing_class import Keystroke
 
 
 def gross_wpm(keystrokes: Iterable[Keystroke], elapsed_sec: float) -> float:
@@ -28,3 +31,88 @@ def per_key_errors(keystrokes: Iterable[Keystroke]) -> dict[str, int]:
         if not ks.correct:
             counter[ks.expected] += 1
     return dict(counter)
+
+
+class RunningStats:
+    """Incremental counterpart of the functions above, updated per keystroke.
+
+    `add` and `remove` must be called in stack order (remove undoes the most
+    recent add), which matches how backspace pops keystrokes.
+    """
+
+    def __init__(self, window_sec: float = 10.0):
+        self.window_sec = window_sec
+        self.total_chars = 0
+        self.considered = 0
+        self.correct = 0
+        self.errors: Counter[str] = Counter()
+        self.attempts: Counter[str] = Counter()
+        self._recent: deque[float] = deque()
+
+    def add(self, ks: Keystroke) -> None:
+        self.total_chars += 1
+        if ks.expected is not None:
+            self.considered += 1
+            self.attempts[ks.expected] += 1
+            if ks.correct:
+                self.correct += 1
+            else:
+                self.errors[ks.expected] += 1
+        self._recent.append(ks.timestamp)
+        self._trim(ks.timestamp)
+
+    def remove(self, ks: Keystroke) -> None:
+        self.total_chars -= 1
+        if ks.expected is not None:
+            self.considered -= 1
+            self.attempts[ks.expected] -= 1
+            if self.attempts[ks.expected] <= 0:
+                del self.attempts[ks.expected]
+            if ks.correct:
+                self.correct -= 1
+            else:
+                self.errors[ks.expected] -= 1
+                if self.errors[ks.expected] <= 0:
+                    del self.errors[ks.expected]
+        if self._recent and self._recent[-1] == ks.timestamp:
+            self._recent.pop()
+
+    def gross_wpm(self, elapsed_sec: float) -> float:
+        if elapsed_sec <= 0:
+            return 0.0
+        return (self.total_chars / 5) / (elapsed_sec / 60)
+
+    def accuracy(self) -> float:
+        if not self.considered:
+            return 100.0
+        return (self.correct / self.considered) * 100
+
+    def per_key_errors(self) -> dict[str, int]:
+        return dict(self.errors)
+
+    def per_key_attempts(self) -> dict[str, int]:
+        return dict(self.attempts)
+
+    def summary(self, elapsed_sec: float) -> dict[str, Any]:
+        """Session result fields as saved by finalize_run."""
+        return {
+            "wpm": self.gross_wpm(max(0.001, elapsed_sec)),
+            "acc": self.accuracy(),
+            "total_keys": self.considered,
+            "correct_keys": self.correct,
+            "errors": self.per_key_errors(),
+            "attempts": self.per_key_attempts(),
+        }
+
+    def rolling_wpm(self, now: float, elapsed_sec: float | None = None) -> float:
+        """Gross WPM over the last `window_sec` seconds (or less early in a run)."""
+        self._trim(now)
+        window = self.window_sec if elapsed_sec is None else min(self.window_sec, elapsed_sec)
+        if window <= 0:
+            return 0.0
+        return (len(self._recent) / 5) / (window / 60)
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_sec
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
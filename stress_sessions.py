@@ -0,0 +1,150 @@
+"""Stress test for concurrent session saves into one shared directory.
+
+Starts many writer processes spread over a few stations, all saving sessions
+with the same second-resolution timestamp while reader processes poll the
+merged history, then checks that nothing was lost, overwritten or torn:
+
+    python3 stress_sessions.py --writers 16 --stations 4 --sessions 25
+
+Prints a JSON report and exits non-zero if any check fails.
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from persistence import (
+    INDEX_NAME,
+    STATIONS_DIR,
+    load_key_stats,
+    load_recent_sessions,
+    load_session_keystrokes,
+    save_session,
+)
+
+TIMESTAMP = "2026-01-01T00:00:00Z"
+
+
+def writer(sessions_dir: str, station: str, writer_id: int, count: int, start) -> None:
+    start.wait()
+    for n in range(count):
+        session = {
+            "timestamp": TIMESTAMP,
+            "mode": "stress",
+            "writer": writer_id,
+            "n": n,
+            "errors": {"q": 1},
+            "attempts": {"q": 2, "w": 2},
+        }
+        save_session(sessions_dir, session, f"{writer_id}:{n}".encode(), station=station)
+
+
+def reader(sessions_dir: str, start, stop, problems) -> None:
+    start.wait()
+    while not stop.is_set():
+        try:
+            for session in load_recent_sessions(sessions_dir, 20):
+                if session.get("mode") != "stress":
+                    problems.put(f"unexpected entry {session!r}")
+            load_key_stats(sessions_dir)
+        except Exception as exc:
+            problems.put(f"reader: {exc!r}")
+
+
+def check(sessions_dir: Path, expected: int) -> list[str]:
+    """Everything that is wrong with the directory after all writers finished."""
+    problems = []
+    shards = sorted((sessions_dir / STATIONS_DIR).iterdir())
+    seen = set()
+    index_entries = 0
+    for shard in shards:
+        for path in shard.glob("session_*.json"):
+            with path.open("r", encoding="utf-8") as f:
+                session = json.load(f)
+            seen.add((session["writer"], session["n"]))
+            if load_session_keystrokes(sessions_dir, session) != f"{session['writer']}:{session['n']}".encode():
+                problems.append(f"{path.name}: keystrokes do not match")
+        with (shard / INDEX_NAME).open("r", encoding="utf-8") as f:
+            for line in f:
+                json.loads(line)
+                index_entries += 1
+        leftovers = [p.name for p in shard.glob(".*.tmp")]
+        if leftovers:
+            problems.append(f"{shard.name}: leftover temp files {leftovers[:3]}")
+    if len(seen) != expected:
+        problems.append(f"{len(seen)} distinct session files, expected {expected}")
+    if index_entries != expected:
+        problems.append(f"{index_entries} index entries, expected {expected}")
+    stats = load_key_stats(sessions_dir)
+    if stats["sessions"] != expected:
+        problems.append(f"key stats count {stats['sessions']} sessions, expected {expected}")
+    recent = load_recent_sessions(sessions_dir, expected + 10)
+    if len(recent) != expected:
+        problems.append(f"merged history has {len(recent)} sessions, expected {expected}")
+    return problems
+
+
+def run(args: argparse.Namespace) -> dict:
+    root = Path(args.dir) if args.dir else Path(tempfile.mkdtemp(prefix="keycast-stress-"))
+    sessions_dir = root / "sessions"
+    start = multiprocessing.Event()
+    stop = multiprocessing.Event()
+    problems = multiprocessing.Queue()
+    writers = [
+        multiprocessing.Process(
+            target=writer, args=(str(sessions_dir), f"station{i % args.stations}", i, args.sessions, start)
+        )
+        for i in range(args.writers)
+    ]
+    readers = [
+        multiprocessing.Process(target=reader, args=(str(sessions_dir), start, stop, problems))
+        for _ in range(args.readers)
+    ]
+    for proc in writers + readers:
+        proc.start()
+    began = time.perf_counter()
+    start.set()
+    for proc in writers:
+        proc.join()
+    took = time.perf_counter() - began
+    stop.set()
+    for proc in readers:
+        proc.join()
+
+    found = [f"writer exited with {proc.exitcode}" for proc in writers if proc.exitcode]
+    while not problems.empty():
+        found.append(problems.get())
+    expected = args.writers * args.sessions
+    found.extend(check(sessions_dir, expected))
+    return {
+        "dir": str(sessions_dir),
+        "writers": args.writers,
+        "stations": args.stations,
+        "readers": args.readers,
+        "sessions": expected,
+        "write_sec": took,
+        "saves_per_sec": expected / took if took else None,
+        "problems": found,
+        "ok": not found,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=16, help="concurrent writer processes")
+    parser.add_argument("--stations", type=int, default=4, help="stations the writers are spread over")
+    parser.add_argument("--sessions", type=int, default=25, help="sessions saved by each writer")
+    parser.add_argument("--readers", type=int, default=2, help="processes polling history meanwhile")
+    parser.add_argument("--dir", default=None, help="scratch directory (default: a new temp dir)")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    print(json.dumps(results, indent=2))
+    return 0 if results["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import os
+import sys
+from pathlib import Path
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pygame
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def pygame_fonts():
+    pygame.font.init()
+    yield
+    pygame.font.quit()
@@ -0,0 +1,28 @@
+"""N-gram latency stats only count plausible inter-key gaps."""
+from analytics import MAX_GAP_SEC, ngram_stats
+from typing_class import Keystroke, KeystrokeLog
+
+
+def journal(keys: list[tuple[float, str]]) -> KeystrokeLog:
+    log = KeystrokeLog()
+    for t, char in keys:
+        log.append(Keystroke(t, char, char, True))
+    return log
+
+
+def test_bigram_latency():
+    stats = ngram_stats(journal([(0.0, "t"), (0.12, "h"), (0.30, "e")]), sizes=(2,))
+    assert stats["ngram_counts"] == {"th": 1, "he": 1}
+    assert round(stats["ngram_latency_ms"]["th"]) == 120
+    assert round(stats["ngram_latency_ms"]["he"]) == 180
+
+
+def test_batched_stamps_are_skipped():
+    # "h" and "e" were dequeued together after a stalled frame.
+    stats = ngram_stats(journal([(0.0, "t"), (0.12, "h"), (0.1200005, "e"), (0.25, "n")]))
+    assert set(stats["ngram_counts"]) == {"th", "en"}
+
+
+def test_long_pauses_are_skipped():
+    stats = ngram_stats(journal([(0.0, "t"), (MAX_GAP_SEC + 1, "h")]))
+    assert stats["ngram_counts"] == {}
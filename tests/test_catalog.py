@@ -0,0 +1,57 @@
+"""Catalog scans without blocking; stats for changed files arrive from a worker."""
+import json
+import threading
+import time
+
+import catalog
+from catalog import Catalog
+
+
+def wait_idle(cat: Catalog, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while cat.busy or cat._worker is not None:
+        assert time.monotonic() < deadline, "catalog stats never arrived"
+        time.sleep(0.01)
+
+
+def test_refresh_lists_files_before_stats_arrive(tmp_path, monkeypatch):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "a.txt").write_text("one two three")
+    release = threading.Event()
+    real_stats = catalog.file_stats
+
+    def slow_stats(path):
+        release.wait(5)
+        return real_stats(path)
+
+    monkeypatch.setattr(catalog, "file_stats", slow_stats)
+    cat = Catalog(texts, tmp_path / "catalog.json")
+    assert [p.name for p in cat.paths] == ["a.txt"]
+    assert cat.busy and cat.info(texts / "a.txt") == {}
+
+    release.set()
+    wait_idle(cat)
+    assert cat.version == 1
+    assert cat.info(texts / "a.txt")["words"] == 3
+    saved = json.loads((tmp_path / "catalog.json").read_text())
+    assert saved["entries"]["a.txt"]["words"] == 3
+
+
+def test_only_changed_files_are_recounted(tmp_path, monkeypatch):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "a.txt").write_text("one two three")
+    (texts / "b.txt").write_text("four five")
+    wait_idle(Catalog(texts, tmp_path / "catalog.json"))
+
+    counted = []
+    real_stats = catalog.file_stats
+    monkeypatch.setattr(catalog, "file_stats", lambda path: counted.append(path.name) or real_stats(path))
+    (texts / "b.txt").write_text("four five six seven")
+    (texts / "a.txt").unlink()
+    cat = Catalog(texts, tmp_path / "catalog.json")
+    wait_idle(cat)
+    assert counted == ["b.txt"]
+    assert [p.name for p in cat.paths] == ["b.txt"]
+    assert cat.info(texts / "b.txt")["words"] == 4
@@ -0,0 +1,63 @@
+"""Corpus shards: rebuilt only on content change, capped postings, drill passages."""
+import os
+
+import corpus
+from corpus import MANIFEST_NAME, POSTING_CAP, CorpusIndex
+
+TEXT = (
+    "The quick brown fox jumps over the lazy dog. "
+    "Queens quietly quote quaint quilts in Quebec. "
+    "Nothing here is about that letter at all, honestly. "
+)
+
+
+def shard_files(cache_dir):
+    return sorted(p.name for p in cache_dir.glob("*.json") if p.name != MANIFEST_NAME)
+
+
+def test_shards_follow_file_content(tmp_path):
+    texts, cache = tmp_path / "texts", tmp_path / "cache" / "corpus"
+    texts.mkdir()
+    (texts / "a.txt").write_text(TEXT)
+    (texts / "b.txt").write_text(TEXT * 2)
+    index = CorpusIndex.load(texts, cache)
+    first = shard_files(cache)
+    assert len(first) == 2
+
+    # Touching a file without changing it keeps its shard.
+    st = (texts / "a.txt").stat()
+    os.utime(texts / "a.txt", (st.st_atime, st.st_mtime + 10))
+    index.refresh()
+    assert shard_files(cache) == first
+
+    (texts / "a.txt").write_text(TEXT + "Another sentence to change the hash.")
+    (texts / "b.txt").unlink()
+    index.refresh()
+    assert len(shard_files(cache)) == 1
+    assert not set(shard_files(cache)) & set(first)
+    assert set(CorpusIndex.load(texts, cache).files) == {"a.txt"}
+
+
+def test_passage_prefers_dense_sentences(tmp_path):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    (texts / "a.txt").write_text(TEXT * 3)
+    index = CorpusIndex.load(texts, tmp_path / "cache" / "corpus")
+    passage = index.passage(["q", "Qu"], length=60, seed=1)
+    assert "Queens quietly" in passage
+    assert "Nothing here" not in passage
+    assert index.passage(["ß"], length=60, seed=1) == ""
+
+
+def test_postings_are_capped(tmp_path):
+    texts = tmp_path / "texts"
+    texts.mkdir()
+    lines = [f"Sentence number {n} has an e in it{'e' * (n % 7)}." for n in range(POSTING_CAP * 3)]
+    (texts / "a.txt").write_text(" ".join(lines))
+    shard = corpus._parse_file(texts / "a.txt")
+    assert len(shard["sentences"]) == len(lines)
+    assert len(shard["sentences_by_gram"]["e"]) == POSTING_CAP
+    # The densest sentences win the capped slots.
+    kept = set(shard["sentences_by_gram"]["e"])
+    density = [s.count("e") / len(s) for s in shard["sentences"]]
+    assert min(density[i] for i in kept) >= max(d for i, d in enumerate(density) if i not in kept)
@@ -0,0 +1,82 @@
+"""DrillBackend against a local stub server, as reached through OPENAI_API_BASE."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from drill_backend import DrillBackend
+
+PAYLOAD = {"model": "stub", "messages": [{"role": "user", "content": "drill"}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers["Content-Length"]))
+        server.requests.append((self.path, self.client_address))
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = json.dumps({"choices": [{"message": {"content": f" reply {len(server.requests)} "}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def backend(stub, tmp_path, **kwargs) -> DrillBackend:
+    host, port = stub.server_address
+    return DrillBackend(f"http://{host}:{port}/v1", cache_path=tmp_path / "cache.json", backoff=0.01, **kwargs)
+
+
+def test_retries_transient_status_on_one_connection(stub, tmp_path):
+    stub.statuses = [503]
+    client = backend(stub, tmp_path)
+    assert client.chat(PAYLOAD, "key") == "reply 2"
+    assert [path for path, _ in stub.requests] == ["/v1/chat/completions"] * 2
+    # The keep-alive connection is reused for the retry.
+    assert len({addr for _, addr in stub.requests}) == 1
+    client.close()
+
+
+def test_gives_up_on_final_status(stub, tmp_path):
+    stub.statuses = [400]
+    client = backend(stub, tmp_path)
+    assert client.chat(PAYLOAD, "key") is None
+    assert len(stub.requests) == 1
+
+
+def test_cache_hit_skips_network(stub, tmp_path):
+    client = backend(stub, tmp_path)
+    assert client.chat(PAYLOAD, "key") == "reply 1"
+    assert client.chat(PAYLOAD, "key") == "reply 1"
+    assert len(stub.requests) == 1
+    # A fresh backend reads the same answer from the on-disk cache.
+    assert backend(stub, tmp_path).chat(PAYLOAD, "key") == "reply 1"
+    assert len(stub.requests) == 1
+
+
+def test_cache_entry_expires(stub, tmp_path):
+    client = backend(stub, tmp_path, cache_ttl=0.2)
+    assert client.chat(PAYLOAD, "key") == "reply 1"
+    time.sleep(0.3)
+    assert client.chat(PAYLOAD, "key") == "reply 2"
+    assert len(stub.requests) == 2
@@ -0,0 +1,106 @@
+"""Layout cache: a stored prefix is resumed exactly, and the cache stays bounded."""
+import os
+import time
+
+import pytest
+
+import text_source
+import text_stream
+from text_stream import TextStream, load_layout
+
+TEXT = (
+    "the quick brown fox jumps over the lazy dog while supercalifragilisticexpialidocious words wrap\n"
+    "and\tkeeps typing until the drill ends. "
+) * 150
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    cache = tmp_path / "layout"
+    monkeypatch.setattr(text_stream, "LAYOUT_CACHE_DIR", str(cache))
+    return cache
+
+
+@pytest.fixture(params=["string", "mapped"])
+def text_file(request, tmp_path, monkeypatch):
+    if request.param == "mapped":
+        monkeypatch.setattr(text_source, "STREAM_MIN_BYTES", 1)
+    path = tmp_path / "book.txt"
+    path.write_text(TEXT)
+    return str(path)
+
+
+def lay_out_all(stream: TextStream) -> None:
+    while stream._extend_layout():
+        pass
+
+
+def stored_layout(key: str, predicate, timeout: float = 5.0):
+    """The stored layout once the background save satisfies `predicate`."""
+    deadline = time.monotonic() + timeout
+    while True:
+        stored = load_layout(key)
+        if stored is not None and predicate(stored):
+            return stored
+        assert time.monotonic() < deadline, "layout was never saved"
+        time.sleep(0.01)
+
+
+def test_stored_prefix_resumes_to_the_same_layout(cache_dir, text_file):
+    reference = TextStream(content=TEXT)
+    lay_out_all(reference)
+
+    first = TextStream(filepath=text_file)
+    first.caret_for_index(len(TEXT) // 3)
+    laid_out = first._laid_out()
+    assert 0 < laid_out < len(TEXT)
+    first.save_layout()
+    prefix = stored_layout(first._layout_key, lambda s: True)
+    assert len(prefix.xs) == laid_out and not prefix.complete
+
+    second = TextStream(filepath=text_file)
+    assert len(second._stored_layout.xs) == laid_out
+    second.caret_for_index(len(TEXT))
+    assert second._layout == reference._layout
+    assert second._line_starts == reference._line_starts
+    second.save_layout()
+    full = stored_layout(second._layout_key, lambda s: s.complete)
+    assert len(full.xs) == len(TEXT)
+    assert list(full.line_starts) == reference._line_starts
+
+    third = TextStream(filepath=text_file)
+    lay_out_all(third)
+    assert third._layout == reference._layout
+    assert third._new_columns is None
+    for stream in (first, second, third):
+        stream.close()
+
+
+def test_unchanged_layout_is_not_rewritten(cache_dir, text_file):
+    stream = TextStream(filepath=text_file)
+    lay_out_all(stream)
+    stream.save_layout()
+    stored_layout(stream._layout_key, lambda s: s.complete)
+    path = cache_dir / f"{stream._layout_key}.bin"
+    os.utime(path, (1, 1))
+
+    again = TextStream(filepath=text_file)
+    lay_out_all(again)
+    again.save_layout()
+    # Loading refreshes the mtime for the LRU; nothing new was laid out to save.
+    assert path.stat().st_mtime > 1
+    assert again._new_columns is None
+    stream.close()
+    again.close()
+
+
+def test_least_recently_used_layouts_are_evicted(cache_dir, monkeypatch):
+    cache_dir.mkdir()
+    for n in range(4):
+        old = cache_dir / f"old{n}.bin"
+        old.write_bytes(b"\0" * 1000)
+        os.utime(old, (n + 1, n + 1))
+    monkeypatch.setattr(text_stream, "LAYOUT_CACHE_BYTES", 2500)
+    xs, ys, widths = (text_stream.array("i", [0] * 100) for _ in range(3))
+    text_stream.store_layout("fresh", ([xs], [ys], [widths]), text_stream.array("i", [0]), (0, 0), True)
+    assert sorted(p.name for p in cache_dir.glob("*.bin")) == ["fresh.bin", "old3.bin"]
@@ -0,0 +1,95 @@
+"""Session storage: shards, index tails, legacy migration and concurrent writers."""
+import argparse
+import json
+
+import persistence
+from persistence import (
+    INDEX_NAME,
+    KEY_STATS_NAME,
+    STATIONS_DIR,
+    _tail_lines,
+    load_key_stats,
+    load_recent_sessions,
+    load_session_keystrokes,
+    save_session,
+    weakest_keys,
+)
+from stress_sessions import run as run_stress
+
+
+def session(ts: str, **fields) -> dict:
+    return {"timestamp": ts, "errors": {}, "attempts": {}, **fields}
+
+
+def test_tail_lines_reads_backwards_across_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence, "_TAIL_BLOCK", 16)
+    path = tmp_path / "lines.jsonl"
+    path.write_text("".join(f"line {i:03d} padding\n" for i in range(50)) + "\n\n")
+    assert _tail_lines(path, 3) == ["line 049 padding", "line 048 padding", "line 047 padding"]
+    assert len(_tail_lines(path, 500)) == 50
+    assert _tail_lines(path, 500)[-1] == "line 000 padding"
+
+
+def test_save_writes_unique_files_into_station_shard(tmp_path):
+    for _ in range(3):
+        save_session(tmp_path, session("2026-01-01T00:00:00Z"), b"keys", station="a")
+    shard = tmp_path / STATIONS_DIR / "a"
+    assert len(list(shard.glob("session_*.json"))) == 3
+    assert len((shard / INDEX_NAME).read_text().splitlines()) == 3
+    recent = load_recent_sessions(tmp_path, 10)
+    assert [s["station"] for s in recent] == ["a"] * 3
+    assert all(load_session_keystrokes(tmp_path, s) == b"keys" for s in recent)
+
+
+def test_recent_sessions_merge_shards_newest_first(tmp_path):
+    # isoformat() leaves out a zero fraction, so "01.5" must still sort after "01".
+    save_session(tmp_path, session("2026-01-01T00:00:01Z"), station="a")
+    save_session(tmp_path, session("2026-01-01T00:00:01.5Z"), station="b")
+    save_session(tmp_path, session("2026-01-01T00:00:02Z"), station="a")
+    save_session(tmp_path, session("2026-01-01T00:00:03Z"), station="a")
+    save_session(tmp_path, session("2026-01-01T00:00:04Z"), station="b")
+    stamps = [s["timestamp"] for s in load_recent_sessions(tmp_path, 10)]
+    assert stamps == [
+        "2026-01-01T00:00:04Z",
+        "2026-01-01T00:00:03Z",
+        "2026-01-01T00:00:02Z",
+        "2026-01-01T00:00:01.5Z",
+        "2026-01-01T00:00:01Z",
+    ]
+    assert [s["timestamp"] for s in load_recent_sessions(tmp_path, 3)] == stamps[:3]
+
+
+def test_legacy_flat_sessions_are_migrated_and_merged(tmp_path):
+    for ts, errors in (("2025-01-01T00:00:00Z", {"a": 2}), ("2025-01-02T00:00:00Z", {"a": 1})):
+        legacy = session(ts, errors=errors, attempts={"a": 4})
+        (tmp_path / f"session_{ts.replace(':', '-')}.json").write_text(json.dumps(legacy))
+    save_session(tmp_path, session("2026-01-01T00:00:00Z", errors={"b": 1}, attempts={"b": 2}), station="a")
+
+    stamps = [s["timestamp"] for s in load_recent_sessions(tmp_path, 10)]
+    assert stamps == ["2026-01-01T00:00:00Z", "2025-01-02T00:00:00Z", "2025-01-01T00:00:00Z"]
+    assert len((tmp_path / INDEX_NAME).read_text().splitlines()) == 2
+    stats = load_key_stats(tmp_path)
+    assert stats["sessions"] == 3
+    assert stats["attempts"] == {"a": 4 * 0.9 + 4, "b": 2}
+
+
+def test_key_stats_rebuilt_from_index_when_missing(tmp_path):
+    save_session(tmp_path, session("2026-01-01T00:00:00Z", errors={"q": 3}, attempts={"q": 5}), station="a")
+    save_session(tmp_path, session("2026-01-01T00:00:01Z", errors={"w": 1}, attempts={"w": 9}), station="a")
+    stats_path = tmp_path / STATIONS_DIR / "a" / KEY_STATS_NAME
+    before = json.loads(stats_path.read_text())
+    stats_path.unlink()
+    assert load_key_stats(tmp_path) == before
+    assert stats_path.exists()
+
+
+def test_weakest_keys_skip_keys_without_attempts(tmp_path):
+    save_session(tmp_path, session("2026-01-01T00:00:00Z", errors={"q": 3, "z": 9}, attempts={"q": 5}), station="a")
+    assert [key for key, _ in weakest_keys(tmp_path)] == ["q"]
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    args = argparse.Namespace(writers=6, stations=2, sessions=5, readers=1, dir=str(tmp_path))
+    results = run_stress(args)
+    assert results["problems"] == []
+    assert results["ok"]
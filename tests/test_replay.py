@@ -0,0 +1,61 @@
+"""Replaying a saved journal reproduces the live run exactly."""
+import pygame
+import pytest
+
+from cursor import Cursor
+from replay import replay_journal
+from text_stream import TextStream
+from typing_class import KeystrokeLog, TypingController
+
+TEXT = "abcd efgh\nijkl"
+
+
+def key(char: str) -> pygame.event.Event:
+    return pygame.event.Event(pygame.KEYDOWN, key=0, unicode=char)
+
+
+# pygame reports Backspace with unicode "\b"; it is typed as a character when
+# backspace is disabled.
+BACKSPACE = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="\b")
+
+
+def live_run(events: list[pygame.event.Event], allow_backspace: bool) -> TypingController:
+    controller = TypingController(TextStream(content=TEXT), Cursor(), allow_backspace=allow_backspace)
+    for t, event in enumerate(events):
+        controller.handle_event(event, float(t))
+    return controller
+
+
+def outcome(controller: TypingController) -> tuple:
+    return (
+        controller.stats.summary(10.0),
+        controller.text_stream.ind,
+        sorted(controller.text_stream.error_indices),
+        list(controller.keystrokes),
+    )
+
+
+@pytest.mark.parametrize("allow_backspace", [True, False])
+def test_replay_matches_live_run(allow_backspace):
+    events = [key("a"), BACKSPACE, key("a"), key("x"), BACKSPACE, key("b"), key("c"), key("q"), key("e")]
+    live = live_run(events, allow_backspace)
+    journal = KeystrokeLog.from_bytes(live.journal.to_bytes())
+    assert journal.allow_backspace is allow_backspace
+    assert outcome(replay_journal(TEXT, journal)) == outcome(live)
+
+
+def test_replay_uses_recorded_backspace_setting():
+    events = [key("a"), BACKSPACE, BACKSPACE, key("b")]
+    data = live_run(events, allow_backspace=False).journal.to_bytes()
+    replayed = replay_journal(TEXT, KeystrokeLog.from_bytes(data))
+    assert replayed.allow_backspace is False
+    # Both backspaces were typed as wrong characters, not undone.
+    assert replayed.stats.summary(1.0)["total_keys"] == 4
+    assert replayed.stats.summary(1.0)["errors"] == {"b": 1, "c": 1, "d": 1}
+
+
+def test_journal_distinguishes_backspace_from_typed_char():
+    journal = live_run([key("a"), BACKSPACE], allow_backspace=True).journal
+    assert [journal.is_backspace(i) for i in range(len(journal))] == [False, True]
+    journal = live_run([key("a"), BACKSPACE], allow_backspace=False).journal
+    assert [journal.is_backspace(i) for i in range(len(journal))] == [False, False]
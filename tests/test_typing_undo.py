@@ -0,0 +1,66 @@
+"""Backspace undoes keystrokes from recorded deltas; check it against a full replay."""
+import random
+
+import pygame
+import pytest
+
+from cursor import Cursor
+from text_stream import TextStream
+from typing_class import TypingController
+
+TEXT = "the quick brown fox jumps over the lazy dog\nand keeps typing until the drill ends. " * 4
+
+
+def key(char: str) -> pygame.event.Event:
+    return pygame.event.Event(pygame.KEYDOWN, key=0, unicode=char)
+
+
+BACKSPACE = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_BACKSPACE, unicode="")
+
+
+def replayed(controller: TypingController) -> TypingController:
+    """A fresh controller fed only the keystrokes that survived every backspace."""
+    fresh = TypingController(TextStream(content=TEXT), Cursor(), clock=lambda: 0.0)
+    for ks in controller.keystrokes:
+        fresh.handle_event(key(ks.char), ks.timestamp)
+    return fresh
+
+
+def state(controller: TypingController) -> tuple:
+    stream = controller.text_stream
+    return (
+        stream.ind,
+        sorted(stream.error_indices),
+        controller.typed_count,
+        controller.stats.summary(1.0),
+        stream.caret_for_index(controller.typed_count),
+        [(ks.char, ks.expected, ks.correct) for ks in controller.keystrokes],
+    )
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_undo_matches_full_replay(seed):
+    rng = random.Random(seed)
+    controller = TypingController(TextStream(content=TEXT), Cursor(), clock=lambda: 0.0)
+    for step in range(rng.randrange(50, 400)):
+        roll = rng.random()
+        if roll < 0.25:
+            controller.handle_event(BACKSPACE, float(step))
+        else:
+            expected = controller.text_stream.peek() or "x"
+            controller.handle_event(key(expected if roll > 0.4 else rng.choice("qzx ")), float(step))
+        if rng.random() < 0.1:
+            assert state(controller) == state(replayed(controller))
+    assert state(controller) == state(replayed(controller))
+
+
+def test_backspace_to_start_clears_everything():
+    controller = TypingController(TextStream(content=TEXT), Cursor(), clock=lambda: 0.0)
+    for char in "thx qz":
+        controller.handle_event(key(char))
+    for _ in range(10):
+        controller.handle_event(BACKSPACE)
+    assert controller.text_stream.ind == 0
+    assert not controller.text_stream.error_indices
+    assert controller.typed_count == 0
+    assert controller.stats.summary(1.0)["total_keys"] == 0
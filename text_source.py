@@ -0,0 +1,228 @@
+"""Character sources behind TextStream: in-memory strings, memory-mapped files or feeds."""
+import mmap
+import os
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Protocol
+
+from catalog import load_text
+
+class ChunkFeed(Protocol):
+    """Non-blocking supplier of text chunks, e.g. drill.Prefetcher."""
+
+    done: bool
+
+    def poll(self) -> str | None: ...
+
+    def close(self) -> None: ...
+
+
+# Files at least this large are memory-mapped and decoded on demand.
+STREAM_MIN_BYTES = 8 * 1024 * 1024
+BLOCK_BYTES = 64 * 1024
+CACHED_BLOCKS = 4
+
+
+class StringSource:
+    """A passage held entirely in memory."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def char(self, index: int) -> str | None:
+        if 0 <= index < len(self.text):
+            return self.text[index]
+        return None
+
+    def window(self, start: int, end: int) -> str:
+        return self.text[start:end]
+
+    def has(self, index: int) -> bool:
+        return index < len(self.text)
+
+    def waiting(self, index: int) -> bool:
+        return False
+
+    def progress(self, index: int) -> float:
+        return min(1.0, index / len(self.text)) if self.text else 1.0
+
+    def trim(self, before: int) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MappedSource:
+    """A UTF-8 file read through mmap, decoded a block at a time.
+
+    Blocks are fixed byte ranges cut on character (and CRLF) boundaries. The
+    char/byte offset of each block start is recorded the first time it is
+    decoded, so random access is a bisect plus at most one block decode, and
+    only a handful of decoded blocks are kept in memory. Opening is O(1).
+    """
+
+    def __init__(self, path: str | os.PathLike[str], block_bytes: int = BLOCK_BYTES):
+        self.path = str(path)
+        self.block_bytes = block_bytes
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else None
+        # Char index and byte offset of every block decoded so far, in order.
+        self._char_starts = [0]
+        self._byte_starts = [0]
+        self._blocks: "OrderedDict[int, str]" = OrderedDict()
+
+    def char(self, index: int) -> str | None:
+        block = self._locate(index)
+        if block is None:
+            return None
+        return self._block_text(block)[index - self._char_starts[block]]
+
+    def window(self, start: int, end: int) -> str:
+        parts = []
+        while start < end:
+            block = self._locate(start)
+            if block is None:
+                break
+            text = self._block_text(block)
+            offset = start - self._char_starts[block]
+            piece = text[offset:offset + end - start]
+            parts.append(piece)
+            start += len(piece)
+        return "".join(parts)
+
+    def has(self, index: int) -> bool:
+        return self._locate(index) is not None
+
+    def waiting(self, index: int) -> bool:
+        return False
+
+    def progress(self, index: int) -> float:
+        if not self.size:
+            return 1.0
+        block = self._locate(index)
+        if block is None:
+            return 1.0
+        # Interpolate within the block by bytes so no full scan is needed.
+        begin = self._byte_starts[block]
+        end = self._byte_end(block)
+        chars = len(self._block_text(block)) or 1
+        offset = begin + (end - begin) * (index - self._char_starts[block]) / chars
+        return min(1.0, offset / self.size)
+
+    def trim(self, before: int) -> None:
+        pass
+
+    def close(self) -> None:
+        self._blocks.clear()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def _locate(self, index: int) -> int | None:
+        """Block containing char `index`, decoding forward as needed; None past the end."""
+        if index < 0:
+            return None
+        while True:
+            block = bisect_right(self._char_starts, index) - 1
+            if block < len(self._char_starts) - 1:
+                return block
+            # Last known block: its end is only known once it has been decoded.
+            text = self._block_text(block)
+            if index < self._char_starts[block] + len(text):
+                return block
+            if self._byte_end(block) >= self.size:
+                return None
+            self._char_starts.append(self._char_starts[block] + len(text))
+            self._byte_starts.append(self._byte_end(block))
+
+    def _byte_end(self, block: int) -> int:
+        if block + 1 < len(self._byte_starts):
+            return self._byte_starts[block + 1]
+        end = self._byte_starts[block] + self.block_bytes
+        if end >= self.size:
+            return self.size
+        data = self._map
+        # Back up to a lead byte so no character or CRLF pair is split.
+        while end > self._byte_starts[block] + 1 and data[end] & 0xC0 == 0x80:
+            end -= 1
+        if data[end - 1] == 0x0D:
+            end -= 1
+        return end
+
+    def _block_text(self, block: int) -> str:
+        text = self._blocks.get(block)
+        if text is not None:
+            self._blocks.move_to_end(block)
+            return text
+        raw = self._map[self._byte_starts[block]:self._byte_end(block)] if self._map else b""
+        # Match the newline handling of text-mode open().
+        text = raw.decode("utf-8", errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+        self._blocks[block] = text
+        while len(self._blocks) > CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return text
+
+
+class FeedSource:
+    """Text pulled from a chunk feed as reads approach the end.
+
+    Reads never block: text the feed has not delivered yet is simply absent,
+    and `waiting` tells that apart from the end of the feed. Only text from
+    the last `trim` point onwards is buffered, so memory stays bounded however
+    long the feed runs. Indices are absolute.
+    """
+
+    def __init__(self, chunks: ChunkFeed):
+        self._chunks = chunks
+        self._buffer = ""
+        self._base = 0
+        self._exhausted = False
+
+    def char(self, index: int) -> str | None:
+        if index < self._base or not self.has(index):
+            return None
+        return self._buffer[index - self._base]
+
+    def window(self, start: int, end: int) -> str:
+        self._fill(end)
+        start = max(start, self._base)
+        return self._buffer[start - self._base:end - self._base]
+
+    def has(self, index: int) -> bool:
+        self._fill(index + 1)
+        return index < self._base + len(self._buffer)
+
+    def waiting(self, index: int) -> bool:
+        """Whether `index` is not buffered yet but the feed may still deliver it."""
+        return not self.has(index) and not self._exhausted
+
+    def progress(self, index: int) -> float:
+        return 1.0 if self._exhausted and not self.has(index) else 0.0
+
+    def trim(self, before: int) -> None:
+        """Forget text before `before`."""
+        if before > self._base:
+            self._buffer = self._buffer[before - self._base:]
+            self._base = before
+
+    def close(self) -> None:
+        self._chunks.close()
+        self._exhausted = True
+
+    def _fill(self, end: int) -> None:
+        while not self._exhausted and self._base + len(self._buffer) < end:
+            chunk = self._chunks.poll()
+            if chunk is None:
+                self._exhausted = self._chunks.done
+                return
+            self._buffer += chunk
+
+
+def open_source(path: str | os.PathLike[str]) -> StringSource | MappedSource:
+    """Memory-map large files; read small ones through the shared text cache."""
+    if os.path.getsize(path) >= STREAM_MIN_BYTES:
+        return MappedSource(path)
+    return StringSource(load_text(path))
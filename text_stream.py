@@ -1,127 +1,562 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
 import pygame
 from constants import *
+from fonts import get_font
+from text_source import FeedSource, MappedSource, StringSource, open_source
+
+FONT_NAME = None
+FONT_SIZE = 40
+
+# Pre-rendered glyphs shared across runs, keyed by (font name, size, char, color).
+_glyph_cache: dict[tuple, pygame.Surface] = {}
+
+
+def render_glyph(font: pygame.font.Font, font_key: tuple, char: str, color) -> pygame.Surface:
+    key = (*font_key, char, tuple(color))
+    glyph = _glyph_cache.get(key)
+    if glyph is None:
+        glyph = font.render(char, True, color)
+        _glyph_cache[key] = glyph
+    return glyph
+
+
+# Per-font advance widths, keyed by (font name, size) and then char.
+_advance_cache: dict[tuple, dict[str, int]] = {}
+
+LAYOUT_CHUNK = 512
+# Layouts of text files (or the prefix a run got through), reused and
+# extended by later runs with the same font and width.
+LAYOUT_CACHE_DIR = "data/cache/layout"
+LAYOUT_CACHE_VERSION = 2
+# Least recently used layouts are removed past this total size.
+LAYOUT_CACHE_BYTES = 256 * 1024 * 1024
+# magic, chars, lines, flags, pen x, pen y
+_LAYOUT_HEADER = struct.Struct("<4sIIIii")
+_LAYOUT_MAGIC = b"LAY2"
+_LAYOUT_COMPLETE = 1
+# A rolling stream drops state for scrolled-off lines once this many pile up.
+TRIM_LINES = 32
+# Rendered line surfaces kept, in screens' worth of lines.
+LINE_CACHE_SCREENS = 3
+# Characters past a chunk that are fetched so a word can be measured whole.
+WORD_LOOKAHEAD = 256
+WHITESPACE = (" ", "\t", "\n")
+
+
+def content_id(source: StringSource | MappedSource) -> str:
+    """Identity of a text file's content for the layout cache.
+
+    In-memory texts are hashed; memory-mapped ones are too large to hash on
+    open, so their path, size and mtime stand in for the content.
+    """
+    if isinstance(source, MappedSource):
+        st = os.stat(source.path)
+        return f"{os.path.realpath(source.path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(source.text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def layout_cache_key(content: str, font_key: tuple, origin: tuple[int, int], max_line_width: int) -> str:
+    keyed = f"{LAYOUT_CACHE_VERSION}|{content}|{font_key}|{origin}|{max_line_width}"
+    return hashlib.sha1(keyed.encode()).hexdigest()
+
+
+@dataclass(slots=True)
+class StoredLayout:
+    """Columns of a stored layout prefix and where laying out resumes after it."""
+
+    xs: memoryview
+    ys: memoryview
+    widths: memoryview
+    line_starts: memoryview
+    pen: tuple[int, int]
+    complete: bool
+
+
+def load_layout(key: str) -> StoredLayout | None:
+    """A stored layout, or the prefix of one that a run stopped partway through.
+
+    The file is memory-mapped and the columns are zero-copy int views, so
+    opening a long text only touches the pages the viewport lays out.
+    """
+    path = Path(LAYOUT_CACHE_DIR) / f"{key}.bin"
+    try:
+        with open(path, "rb") as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, chars, lines, flags, pen_x, pen_y = _LAYOUT_HEADER.unpack_from(data)
+    except (OSError, ValueError, struct.error):
+        return None
+    itemsize = array("i").itemsize
+    if magic != _LAYOUT_MAGIC or len(data) != _LAYOUT_HEADER.size + (3 * chars + lines) * itemsize:
+        return None
+    try:
+        # The mtime orders the cache for eviction.
+        os.utime(path)
+    except OSError:
+        pass
+    view = memoryview(data)[_LAYOUT_HEADER.size:].cast("i")
+    return StoredLayout(
+        view[:chars],
+        view[chars:2 * chars],
+        view[2 * chars:3 * chars],
+        view[3 * chars:],
+        (pen_x, pen_y),
+        bool(flags & _LAYOUT_COMPLETE),
+    )
+
+
+def store_layout(
+    key: str,
+    columns: tuple[list, list, list],
+    line_starts: array,
+    pen: tuple[int, int],
+    complete: bool,
+) -> None:
+    """Write a layout, then evict the least recently used ones past LAYOUT_CACHE_BYTES.
+
+    `columns` holds the xs, ys and widths each as a list of int buffers
+    (a stored prefix followed by what was laid out after it).
+    """
+    path = Path(LAYOUT_CACHE_DIR) / f"{key}.bin"
+    chars = sum(len(part) for part in columns[0])
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_LAYOUT_HEADER.pack(_LAYOUT_MAGIC, chars, len(line_starts), _LAYOUT_COMPLETE if complete else 0, *pen))
+            for parts in columns:
+                for part in parts:
+                    f.write(part)
+            f.write(line_starts)
+        os.replace(tmp_name, path)
+    except OSError:
+        return
+    _prune_layouts(path)
+
+
+def _prune_layouts(keep: Path) -> None:
+    files = []
+    for item in Path(LAYOUT_CACHE_DIR).glob("*.bin"):
+        try:
+            st = item.stat()
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, item))
+    total = sum(size for _, size, _ in files)
+    for _, size, item in sorted(files):
+        if total <= LAYOUT_CACHE_BYTES:
+            break
+        if item == keep:
+            continue
+        try:
+            item.unlink()
+        except OSError:
+            continue
+        total -= size
+
 
 class TextStream(pygame.sprite.Sprite):
-    def __init__(self, filepath: str | None = None, content: str | None = None):
+    def __init__(
+        self,
+        filepath: str | None = None,
+        content: str | None = None,
+        source: StringSource | MappedSource | FeedSource | None = None,
+        rolling: bool = False,
+    ):
         if hasattr(self, "containers"):
             super().__init__(self.containers) # type: ignore[attr-defined]
         else:
             super().__init__()
         self.filepath = filepath or 'data/texts/sample1.txt'
         self.ind = 0
-        if content is not None:
-            self.content = content
+        if source is not None:
+            self.source = source
+        elif content is not None:
+            self.source = StringSource(content)
         else:
-            with open(self.filepath, 'r') as file:
-                self.content = file.read()
+            self.source = open_source(self.filepath)
         self.error_indices: set[int] = set()
-        self.font = pygame.font.Font(None, 40)
+        self.font_key = (FONT_NAME, FONT_SIZE)
+        self.font = get_font(FONT_SIZE, FONT_NAME)
+        self._advances = _advance_cache.setdefault(self.font_key, {})
         self.line_height = self.font.get_linesize()
         self.origin = (20, HUD_HEIGHT + 20)
         self.max_line_width = SCREEN_WIDTH - 40
-        self._layout = self._compute_layout()
-    
-    def draw(self, screen):
-        for idx, char, x, y, _ in self._layout:
-            if char == "\n":
+        # Layout is built lazily in chunks as the caret and viewport need it.
+        # Entries are (idx, char, x, y, width) in unscrolled coordinates.
+        self._layout: list[tuple[int, str, int, int, int]] = []
+        self._line_starts: list[int] = []
+        # A rolling stream trims consumed lines, so both lists are offset:
+        # _layout[0] is char _layout_base and _line_starts[0] is line _line_base.
+        self.rolling = rolling
+        self._layout_base = 0
+        self._line_base = 0
+        # Lowest index the caret may retreat to (the trim point).
+        self.min_index = 0
+        self._pen = self.origin
+        self.visible_lines = max(1, (SCREEN_HEIGHT - self.origin[1]) // self.line_height)
+        self.top_line = 0
+        # Retained copy of the rendered passage; only dirty cells are re-rendered.
+        self.surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        # Rendered lines keyed by line number, least recently used first. A
+        # state change patches the cell in its cached line, so typed and
+        # untouched lines are reused as-is when the view scrolls.
+        self._line_cache: OrderedDict[int, pygame.Surface] = OrderedDict()
+        self._line_cache_size = self.visible_lines * LINE_CACHE_SCREENS + 2
+        # Text files get their layout from (and save it to) the on-disk cache.
+        self._layout_key: str | None = None
+        self._stored_layout: StoredLayout | None = None
+        # (xs, ys, widths) collected as chunks are laid out past the stored
+        # prefix (or from the start, for a text that is not in the cache yet).
+        self._new_columns: tuple[array, array, array] | None = None
+        self._layout_complete = False
+        if source is None and content is None:
+            self._layout_key = layout_cache_key(content_id(self.source), self.font_key, self.origin, self.max_line_width)
+            self._stored_layout = load_layout(self._layout_key)
+            if self._stored_layout is None:
+                self._new_columns = (array("i"), array("i"), array("i"))
+        self._dirty: set[int] = set()
+        self._needs_full_render = True
+        # Laid-out length when the viewport was last painted short of text a
+        # feed had yet to deliver; the view is repainted once more arrives.
+        self._short_view_at: int | None = None
+
+    def draw(self, screen) -> list[pygame.Rect]:
+        """Blit changed cells onto the screen and return the rects that changed."""
+        if self._short_view_at is not None:
+            self._visible_range()
+            if self._laid_out() > self._short_view_at:
+                # The last line painted may have been cut short; render it again.
+                if self._short_view_at > self._layout_base:
+                    self._line_cache.pop(self._line_of(self._short_view_at - 1), None)
+                self._needs_full_render = True
+        if self._needs_full_render:
+            self._evict_lines(self._dirty)
+            self.surface.fill(BLACK)
+            self._visible_range()
+            last_line = min(self.top_line + self.visible_lines + 1, self._line_count())
+            for line in range(self.top_line, last_line):
+                y = self.origin[1] + (line - self.top_line) * self.line_height
+                self.surface.blit(self._line_surface(line), (0, y))
+            self._short_view_at = self._laid_out() if self.source.waiting(self._laid_out()) else None
+            self._needs_full_render = False
+            self._dirty.clear()
+            screen.blit(self.surface, (0, 0))
+            return [self.surface.get_rect()]
+
+        rects = []
+        start, end = self._visible_range()
+        offscreen = []
+        for idx in self._dirty:
+            if not start <= idx < end:
+                offscreen.append(idx)
                 continue
+            rect = self._render_cell(self._layout[idx - self._layout_base])
+            screen.blit(self.surface, rect, rect)
+            rects.append(rect)
+        self._evict_lines(offscreen)
+        self._dirty.clear()
+        return rects
 
-            if idx in self.error_indices:
-                color = RED
-            elif idx < self.ind:
-                color = GREEN
-            else:
-                color = WHITE
+    def _evict_lines(self, indices) -> None:
+        """Drop cached lines holding changed cells that are not being patched."""
+        end = self._laid_out()
+        for idx in indices:
+            if self._layout_base <= idx < end:
+                self._line_cache.pop(self._line_of(idx), None)
+
+    def invalidate(self) -> None:
+        """Force a full repaint on the next draw."""
+        self._needs_full_render = True
+
+    def _render_cell(self, entry) -> pygame.Rect:
+        """Re-render one cell in its line and copy it to the retained surface."""
+        idx, char, x, y, width = entry
+        line = (y - self.origin[1]) // self.line_height
+        cell = pygame.Rect(x, 0, width, self.line_height)
+        line_surface = self._line_cache.get(line)
+        if line_surface is None:
+            line_surface = self._line_surface(line)
+        else:
+            self._line_cache.move_to_end(line)
+            line_surface.fill(BLACK, cell)
+            self._draw_glyph(line_surface, entry)
+        rect = pygame.Rect(x, y - self.top_line * self.line_height, width, self.line_height)
+        self.surface.blit(line_surface, rect, cell)
+        return rect
 
-            text_surface = self.font.render(char, True, color)
-            screen.blit(text_surface, (x, y))
+    def _line_surface(self, line: int) -> pygame.Surface:
+        surface = self._line_cache.get(line)
+        if surface is not None:
+            self._line_cache.move_to_end(line)
+            return surface
+        surface = pygame.Surface((SCREEN_WIDTH, self.line_height))
+        surface.fill(BLACK)
+        offset = line - self._line_base
+        start = self._line_starts[offset]
+        end = self._line_starts[offset + 1] if offset + 1 < len(self._line_starts) else self._laid_out()
+        base = self._layout_base
+        for entry in self._layout[start - base:end - base]:
+            self._draw_glyph(surface, entry)
+        self._line_cache[line] = surface
+        if len(self._line_cache) > self._line_cache_size:
+            self._line_cache.popitem(last=False)
+        return surface
+
+    def _draw_glyph(self, surface: pygame.Surface, entry) -> None:
+        idx, char, x, _, _ = entry
+        if char in WHITESPACE:
+            return
+
+        if idx in self.error_indices:
+            color = RED
+        elif idx < self.ind:
+            color = GREEN
+        else:
+            color = WHITE
+
+        surface.blit(render_glyph(self.font, self.font_key, char, color), (x, 0))
+
+    def _line_of(self, index: int) -> int:
+        """Line holding laid-out char `index`, by bisecting the line starts."""
+        return self._line_base + bisect_right(self._line_starts, index) - 1
+
+    def _visible_range(self) -> tuple[int, int]:
+        """Content indices of the laid-out characters inside the viewport."""
+        last_line = self.top_line + self.visible_lines + 1
+        while self._line_count() <= last_line and self._extend_layout():
+            pass
+        if self.top_line >= self._line_count():
+            return self._laid_out(), self._laid_out()
+        line_starts = self._line_starts
+        start = line_starts[self.top_line - self._line_base]
+        end = line_starts[last_line - self._line_base] if last_line < self._line_count() else self._laid_out()
+        return start, end
+
+    def _laid_out(self) -> int:
+        return self._layout_base + len(self._layout)
+
+    def _line_count(self) -> int:
+        return self._line_base + len(self._line_starts)
+
+    def _trim_consumed(self) -> None:
+        """Drop layout, text and error state for lines scrolled off the top."""
+        if self.top_line - self._line_base < TRIM_LINES:
+            return
+        drop_lines = self.top_line - self._line_base
+        cut = self._line_starts[drop_lines]
+        del self._line_starts[:drop_lines]
+        del self._layout[:cut - self._layout_base]
+        self._line_base = self.top_line
+        self._layout_base = cut
+        self.min_index = cut
+        self.error_indices = {i for i in self.error_indices if i >= cut}
+        self._dirty = {i for i in self._dirty if i >= cut}
+        for line in [line for line in self._line_cache if line < self._line_base]:
+            del self._line_cache[line]
+        # Keep the char before the cut: layout reads it to detect word starts.
+        self.source.trim(cut - 1)
 
     def update(self, dt):
         pass
 
     def peek(self):
-        if self.ind >= len(self.content):
-            return None
-        return self.content[self.ind]
+        return self.source.char(self.ind)
+
+    def finished(self) -> bool:
+        return not self.source.has(self.ind) and not self.source.waiting(self.ind)
+
+    def waiting(self) -> bool:
+        """True while a feed has not yet delivered the text at the caret."""
+        return self.source.waiting(self.ind)
+
+    def progress(self) -> float:
+        return self.source.progress(self.ind)
+
+    def save_layout(self) -> None:
+        """Store what this run laid out for later runs, on a background thread.
+
+        A run that stops partway through a long text stores the prefix, and
+        the next run resumes laying out after it; nothing is laid out here.
+        """
+        if self._new_columns is None or not self._new_columns[0]:
+            return
+        stored = self._stored_layout
+        prefix = [] if stored is None else [(stored.xs, stored.ys, stored.widths)]
+        columns = tuple(list(parts) for parts in zip(*prefix, self._new_columns))
+        self._new_columns = None
+        args = (self._layout_key, columns, array("i", self._line_starts), self._pen, self._layout_complete)
+        threading.Thread(target=store_layout, args=args, daemon=True).start()
+
+    def close(self) -> None:
+        self.source.close()
 
     def advance(self, clear_error: bool = True):
         if clear_error and self.ind in self.error_indices:
             self.error_indices.discard(self.ind)
-        self.ind = min(self.ind + 1, len(self.content))
+        self._dirty.add(self.ind)
+        if self.source.has(self.ind):
+            self.ind += 1
 
     def retreat(self, target_index: int | None = None):
         if target_index is None:
             target_index = self.ind - 1
-        self.ind = max(0, min(target_index, len(self.content)))
+        target_index = max(self.min_index, min(target_index, self.ind))
+        self._dirty.update(range(target_index, self.ind))
+        self.ind = target_index
 
     def mark_error(self):
-        if self.ind < len(self.content):
+        if self.source.has(self.ind):
             self.error_indices.add(self.ind)
+            self._dirty.add(self.ind)
 
     def clear_error(self, index: int):
         self.error_indices.discard(index)
+        self._dirty.add(index)
 
     def caret_for_index(self, typed_index: int):
-        if not self._layout:
-            start_x, start_y = self.origin
-            return start_x, start_y, self.line_height
-
-        clamped_index = max(0, min(typed_index, len(self._layout)))
+        """Screen position of the caret, scrolling so that it stays in view."""
+        while self._laid_out() < typed_index and self._extend_layout():
+            pass
+        clamped_index = max(self._layout_base, min(typed_index, self._laid_out()))
         start_x, start_y = self.origin
 
-        if clamped_index == 0:
-            return start_x, start_y, self.line_height
+        if clamped_index == self._layout_base:
+            # First kept char; trimming always cuts at a line start.
+            line, x = self._line_base, start_x
+        else:
+            prev = clamped_index - 1
+            line = self._line_of(prev)
+            _, prev_char, prev_x, _, prev_width = self._layout[prev - self._layout_base]
+            if prev_char == "\n":
+                line, x = line + 1, start_x
+            else:
+                x = prev_x + prev_width
+
+        self._scroll_to_line(line)
+        return x, start_y + (line - self.top_line) * self.line_height, self.line_height
+
+    def _scroll_to_line(self, line: int) -> None:
+        # Keep one line of context above the caret and one line of lookahead below.
+        top = self.top_line
+        if line < top:
+            top = max(self._line_base, line - 1)
+        elif line >= top + self.visible_lines - 1:
+            top = max(self._line_base, line - 1)
+        if top != self.top_line:
+            self.top_line = top
+            self._needs_full_render = True
+            if self.rolling:
+                self._trim_consumed()
+
+    def _advance_width(self, char: str) -> int:
+        width = self._advances.get(char)
+        if width is None:
+            width = self.font.size(char)[0]
+            self._advances[char] = width
+        return width
 
-        prev_idx, prev_char, prev_x, prev_y, prev_width = self._layout[clamped_index - 1]
+    def _word_width(self, text: str, start: int, limit: int) -> int:
+        """Width of the word starting at `text[start]`, stopping once it exceeds `limit`."""
+        width = 0
+        for end in range(start, len(text)):
+            char = text[end]
+            if char in WHITESPACE:
+                break
+            width += self._advance_width(char)
+            if width > limit:
+                break
+        return width
 
-        if prev_char == "\n":
-            return start_x, prev_y + self.line_height, self.line_height
+    def _extend_from_store(self, begin: int, chunk: int) -> bool:
+        stored = self._stored_layout
+        line_starts = stored.line_starts
+        end = min(begin + chunk, len(stored.xs))
+        text = self.source.window(begin, end)
+        self._layout.extend(
+            zip(range(begin, end), text, stored.xs[begin:end], stored.ys[begin:end], stored.widths[begin:end])
+        )
+        while len(self._line_starts) < len(line_starts) and line_starts[len(self._line_starts)] < end:
+            self._line_starts.append(line_starts[len(self._line_starts)])
+        return True
 
-        return prev_x + prev_width, prev_y, self.line_height
+    def _extend_layout(self, chunk: int = LAYOUT_CHUNK) -> bool:
+        """Lay out the next `chunk` characters; returns False once content is exhausted."""
+        begin = self._laid_out()
+        stored = self._stored_layout
+        if stored is not None and self._new_columns is None:
+            if begin < len(stored.xs):
+                return self._extend_from_store(begin, chunk)
+            if stored.complete:
+                return False
+            # A run stopped partway through last time; carry on after its prefix.
+            self._pen = stored.pen
+            self._new_columns = (array("i"), array("i"), array("i"))
+        # Decode the chunk once, plus the char before it and enough lookahead
+        # to measure a word that straddles the chunk end.
+        lead = 1 if begin else 0
+        text = self.source.window(begin - lead, begin + chunk + WORD_LOOKAHEAD)
+        count = min(chunk, len(text) - lead)
+        if count <= 0:
+            self._layout_complete = not self.source.waiting(begin)
+            return False
 
-    def _compute_layout(self):
-        positions = []
+        positions = self._layout
+        line_starts = self._line_starts
         start_x, start_y = self.origin
-        x, y = start_x, start_y
+        x, y = self._pen
         max_width = self.max_line_width
+        line_height = self.line_height
 
-        for idx, char in enumerate(self.content):
-            if char == "\n":
-                positions.append((idx, char, x, y, 0))
-                x = start_x
-                y += self.line_height
-                continue
+        for offset in range(lead, lead + count):
+            idx = begin + offset - lead
+            char = text[offset]
+            if char != "\n":
+                # If this is the start of a word, check if it fits; wrap before it if needed.
+                prev_char = text[offset - 1] if offset > 0 else " "
+                if char not in WHITESPACE and prev_char in WHITESPACE and x > start_x:
+                    word_width = self._word_width(text, offset, max_width)
+                    if x + word_width > start_x + max_width:
+                        x = start_x
+                        y += line_height
 
-            # If this is the start of a word, check if it fits; wrap before it if needed.
-            is_word_char = char not in (" ", "\t", "\n")
-            prev_char = self.content[idx - 1] if idx > 0 else " "
-            starting_word = is_word_char and prev_char in (" ", "\t", "\n")
-            if starting_word:
-                end = idx
-                while end < len(self.content) and self.content[end] not in (" ", "\t", "\n"):
-                    end += 1
-                word = self.content[idx:end]
-                word_width, _ = self.font.size(word)
-                if x > start_x and x + word_width > start_x + max_width:
+                char_width = self._advance_width(char)
+                # For extremely long single words, fall back to mid-word wrap.
+                if x + char_width > start_x + max_width:
                     x = start_x
-                    y += self.line_height
+                    y += line_height
+            else:
+                char_width = 0
 
-            char_width, _ = self.font.size(char)
-            # For extremely long single words, fall back to mid-word wrap.
-            if x + char_width > start_x + max_width:
-                x = start_x
-                y += self.line_height
+            line = (y - start_y) // line_height
+            while self._line_base + len(line_starts) <= line:
+                line_starts.append(idx)
+            positions.append((idx, char, x, y, char_width))
 
             if char == "\n":
-                positions.append((idx, char, x, y, 0))
                 x = start_x
-                y += self.line_height
-                continue
-
-            positions.append((idx, char, x, y, char_width))
-            x += char_width
-
-        return positions
-
+                y += line_height
+            else:
+                x += char_width
 
-    
+        self._pen = (x, y)
+        if len(text) - lead == count and not self.source.waiting(begin + count):
+            # The window came back short: this chunk reached the end of the text.
+            self._layout_complete = True
+        if self._new_columns is not None:
+            xs, ys, widths = self._new_columns
+            added = positions[len(positions) - count:]
+            xs.extend(entry[2] for entry in added)
+            ys.extend(entry[3] for entry in added)
+            widths.extend(entry[4] for entry in added)
+        return True
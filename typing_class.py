@@ -1,13 +1,19 @@
+import struct
+import sys
 import time
-import pygame
+from array import array
 from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import pygame
 
 from cursor import Cursor
 from text_stream import TextStream
 from constants import ALLOW_BACKSPACE
+from scoring import RunningStats
 
 
-@dataclass
+@dataclass(slots=True)
 class Keystroke:
     timestamp: float
     char: str
@@ -15,19 +21,178 @@ class Keystroke:
     correct: bool
 
 
+_NO_EXPECTED = -1
+# Char column value of a handled backspace; no typed character can collide with it.
+_BACKSPACE = -2
+# Magic, key count, flags.
+_LOG_HEADER = struct.Struct("<4sII")
+_LOG_MAGIC = b"KSL2"
+_FLAG_ALLOW_BACKSPACE = 1
+
+
+class KeystrokeLog:
+    """Struct-of-arrays keystroke storage (~17 bytes per key).
+
+    Timestamps are float64, chars/expected are codepoints (-1 for no expected
+    char) and `correct` is a bitset. Indexing and iteration yield `Keystroke`
+    views so code written against `list[Keystroke]` keeps working.
+
+    A journal also records handled backspaces (`append_backspace`, viewed with
+    an empty char) and whether backspace was allowed during the run.
+    """
+
+    def __init__(self, allow_backspace: bool = True):
+        self.allow_backspace = allow_backspace
+        self.timestamps = array("d")
+        self.chars = array("i")
+        self.expected = array("i")
+        self._correct_bits = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[Keystroke]:
+        for i in range(len(self.timestamps)):
+            yield self._view(i)
+
+    def __getitem__(self, index: int) -> Keystroke:
+        n = len(self.timestamps)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError("keystroke index out of range")
+        return self._view(index)
+
+    def append(self, ks: Keystroke) -> None:
+        i = len(self.timestamps)
+        self.timestamps.append(ks.timestamp)
+        self.chars.append(ord(ks.char[0]))
+        self.expected.append(_NO_EXPECTED if ks.expected is None else ord(ks.expected))
+        if i % 8 == 0:
+            self._correct_bits.append(0)
+        if ks.correct:
+            self._correct_bits[i >> 3] |= 1 << (i & 7)
+
+    def append_backspace(self, timestamp: float) -> None:
+        i = len(self.timestamps)
+        self.timestamps.append(timestamp)
+        self.chars.append(_BACKSPACE)
+        self.expected.append(_NO_EXPECTED)
+        if i % 8 == 0:
+            self._correct_bits.append(0)
+
+    def is_backspace(self, index: int) -> bool:
+        return self.chars[index] == _BACKSPACE
+
+    def pop(self) -> Keystroke:
+        if not self.timestamps:
+            raise IndexError("pop from empty KeystrokeLog")
+        i = len(self.timestamps) - 1
+        ks = self._view(i)
+        self.timestamps.pop()
+        self.chars.pop()
+        self.expected.pop()
+        if i % 8 == 0:
+            self._correct_bits.pop()
+        else:
+            self._correct_bits[i >> 3] &= ~(1 << (i & 7))
+        return ks
+
+    def drop_front(self, count: int) -> int:
+        """Forget the oldest keystrokes, rounded down to whole bitset bytes; returns how many."""
+        count = min(count, len(self)) & ~7
+        del self.timestamps[:count]
+        del self.chars[:count]
+        del self.expected[:count]
+        del self._correct_bits[:count >> 3]
+        return count
+
+    def is_correct(self, index: int) -> bool:
+        return bool(self._correct_bits[index >> 3] >> (index & 7) & 1)
+
+    def to_bytes(self, origin: float = 0.0) -> bytes:
+        """Serialize as a little-endian header followed by each column.
+
+        Timestamps are stored relative to `origin`.
+        """
+        timestamps = self.timestamps
+        if origin:
+            timestamps = array("d", (t - origin for t in timestamps))
+        columns = [timestamps, self.chars, self.expected]
+        if sys.byteorder != "little":
+            columns = [array(col.typecode, col) for col in columns]
+            for col in columns:
+                col.byteswap()
+        flags = _FLAG_ALLOW_BACKSPACE if self.allow_backspace else 0
+        parts = [_LOG_HEADER.pack(_LOG_MAGIC, len(self), flags)]
+        parts.extend(col.tobytes() for col in columns)
+        parts.append(bytes(self._correct_bits))
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "KeystrokeLog":
+        magic, n, flags = _LOG_HEADER.unpack_from(data)
+        if magic != _LOG_MAGIC:
+            raise ValueError("not a keystroke log")
+        log = cls(allow_backspace=bool(flags & _FLAG_ALLOW_BACKSPACE))
+        offset = _LOG_HEADER.size
+        for col, size in ((log.timestamps, 8), (log.chars, 4), (log.expected, 4)):
+            col.frombytes(data[offset:offset + n * size])
+            if sys.byteorder != "little":
+                col.byteswap()
+            offset += n * size
+        log._correct_bits = bytearray(data[offset:offset + (n + 7) // 8])
+        return log
+
+    def _view(self, i: int) -> Keystroke:
+        cp = self.expected[i]
+        char = self.chars[i]
+        return Keystroke(
+            self.timestamps[i],
+            "" if char == _BACKSPACE else chr(char),
+            None if cp == _NO_EXPECTED else chr(cp),
+            self.is_correct(i),
+        )
+
+
 class TypingController:
-    def __init__(self, text_stream: TextStream, cursor: Cursor):
+    def __init__(
+        self,
+        text_stream: TextStream,
+        cursor: Cursor,
+        clock: Callable[[], float] = time.perf_counter,
+        undo_limit: int | None = None,
+        journal_limit: int | None = None,
+        allow_backspace: bool = ALLOW_BACKSPACE,
+    ):
         self.text_stream = text_stream
         self.cursor = cursor
-        self.keystrokes: list[Keystroke] = []
+        self.clock = clock
+        self.allow_backspace = allow_backspace
+        # Optional caps for endless runs: only the newest keystrokes are kept
+        # for backspace and for the saved journal.
+        self.undo_limit = undo_limit
+        self.journal_limit = journal_limit
+        self.keystrokes = KeystrokeLog()
+        # Every handled key in order, including backspaces, so a run can be
+        # recorded and replayed exactly.
+        self.journal = KeystrokeLog(allow_backspace)
+        self.stats = RunningStats()
+        # One (index before the key, error-set change) entry per keystroke so
+        # backspace can restore state without replaying the whole run.
+        # The error change is 1 if the key added an error, -1 if it cleared one.
+        self._undo_log: list[tuple[int, int]] = []
         self.typed_count = 0
 
-    def handle_event(self, event: pygame.event.Event) -> None:
+    def handle_event(self, event: pygame.event.Event, arrival: float | None = None) -> None:
+        """Apply a key event; `arrival` is when it was dequeued, on `self.clock`'s timebase."""
         if event.type != pygame.KEYDOWN:
             return
 
-        if event.key == pygame.K_BACKSPACE and ALLOW_BACKSPACE:
-            self._undo_last()
+        if event.key == pygame.K_BACKSPACE and self.allow_backspace:
+            if self._can_undo():
+                self.journal.append_backspace(self._event_time(arrival))
+                self._undo_last()
             return
 
         if not event.unicode:
@@ -37,48 +202,59 @@ class TypingController:
         char = event.unicode
         correct = expected is not None and char == expected
 
-        self.keystrokes.append(Keystroke(time.time(), char, expected, correct))
-
-        if expected is None:
-            self.typed_count += 1
-            self._move_cursor()
-            return
+        keystroke = Keystroke(self._event_time(arrival), char, expected, correct)
+        self.keystrokes.append(keystroke)
+        self.journal.append(keystroke)
+        self.stats.add(keystroke)
 
-        if correct:
-            self.text_stream.advance(clear_error=True)
-        else:
-            self.text_stream.mark_error()
-            self.text_stream.advance(clear_error=False)
-
-        self.typed_count += 1
+        self._apply_keystroke(expected is not None, correct)
         self._move_cursor()
+        self._enforce_limits()
 
-    def _undo_last(self):
-        if not self.keystrokes:
-            return
+    def _event_time(self, arrival: float | None) -> float:
+        return self.clock() if arrival is None else arrival
 
-        self.keystrokes.pop()
-        self._recompute_state()
-        self._move_cursor()
+    def _enforce_limits(self) -> None:
+        # Trim to half the cap so the cost is amortized over many keys.
+        if self.undo_limit and len(self.keystrokes) > self.undo_limit:
+            dropped = self.keystrokes.drop_front(len(self.keystrokes) - self.undo_limit // 2)
+            del self._undo_log[:dropped]
+        if self.journal_limit and len(self.journal) > self.journal_limit:
+            self.journal.drop_front(len(self.journal) - self.journal_limit // 2)
 
-    def _recompute_state(self):
-        self.text_stream.retreat(0)
-        self.text_stream.error_indices = set()
-        self.typed_count = 0
-
-        for ks in self.keystrokes:
-            expected = self.text_stream.peek()
-            if expected is None:
-                self.typed_count += 1
-                continue
-
-            if ks.correct:
+    def _apply_keystroke(self, has_expected: bool, correct: bool):
+        index = self.text_stream.ind
+        error_change = 0
+        if has_expected:
+            if correct:
+                if index in self.text_stream.error_indices:
+                    error_change = -1
                 self.text_stream.advance(clear_error=True)
             else:
+                if index not in self.text_stream.error_indices:
+                    error_change = 1
                 self.text_stream.mark_error()
                 self.text_stream.advance(clear_error=False)
+        self._undo_log.append((index, error_change))
+        self.typed_count += 1
+
+    def _can_undo(self) -> bool:
+        # Text before min_index has been trimmed off a rolling stream.
+        return bool(self.keystrokes) and self._undo_log[-1][0] >= self.text_stream.min_index
 
-            self.typed_count += 1
+    def _undo_last(self):
+        if not self._can_undo():
+            return
+
+        self.stats.remove(self.keystrokes.pop())
+        index, error_change = self._undo_log.pop()
+        self.text_stream.retreat(index)
+        if error_change == 1:
+            self.text_stream.clear_error(index)
+        elif error_change == -1:
+            self.text_stream.mark_error()
+        self.typed_count -= 1
+        self._move_cursor()
 
     def _move_cursor(self):
         caret_x, caret_y, caret_height = self.text_stream.caret_for_index(self.typed_count)